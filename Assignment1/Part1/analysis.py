@@ -1,65 +1,502 @@
-
 from scapy.all import rdpcap
 import matplotlib.pyplot as plt
 from collections import defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import argparse
 import csv
+import hashlib
+import mmap
+import os
+import pickle
+import socket
+import struct
 from tqdm import tqdm  # Import tqdm for progress tracking
+import numpy as np
+from sketches import PairSketch
 
-# Step 1: Load the pcap file
-pcap_file = "Captured.pcap"
-packets = rdpcap(pcap_file)
-
-# Step 2: Analyze packet sizes
-packet_sizes = [len(pkt) for pkt in packets]
-total_packets = len(packets)
-total_data = sum(packet_sizes)
-min_size = min(packet_sizes)
-max_size = max(packet_sizes)
-avg_size = total_data / total_packets
-
-print(f"Total Packets: {total_packets}")
-print(f"Total Data: {total_data} bytes")
-print(f"Min Packet Size: {min_size} bytes")
-print(f"Max Packet Size: {max_size} bytes")
-print(f"Average Packet Size: {avg_size:.2f} bytes")
-
-# Plot histogram
-plt.hist(packet_sizes, bins=20, color='blue', edgecolor='black')
-plt.title("Packet Size Distribution")
-plt.xlabel("Packet Size (bytes)")
-plt.ylabel("Frequency")
-plt.show()
-
-# Step 3: Initialize dictionaries and sets
-flows_by_src = defaultdict(int)    # Total flows where IP is source
-flows_by_dst = defaultdict(int)    # Total flows where IP is destination
-data_by_pair = defaultdict(int)    # Data transferred per (source IP:port, destination IP:port)
-unique_pairs = set()               # Unique source-destination pairs
-
-# Step 4: Process packets with tqdm progress tracking
-print("\nProcessing packets...")
-for pkt in tqdm(packets, desc="Analyzing", unit="pkt"):
-    if pkt.haslayer('IP') and pkt.haslayer('TCP'):
-        src_ip = pkt['IP'].src
-        dst_ip = pkt['IP'].dst
-        src_port = pkt['TCP'].sport
-        dst_port = pkt['TCP'].dport
-        packet_size = len(pkt)
+# Classic pcap file format (as written by the C++ sniffer / tcpdump)
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),  # little-endian, microsecond timestamps
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),  # big-endian, microsecond timestamps
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),  # little-endian, nanosecond timestamps
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),  # big-endian, nanosecond timestamps
+}
+PCAP_GLOBAL_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+
+# Link-layer types we can locate the IPv4 header in
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101)
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+
+# Parallel mode: shards per worker (more shards than workers evens out the load)
+SHARDS_PER_WORKER = 4
+# Consecutive plausible record headers required to accept a shard boundary
+BOUNDARY_CHAIN_LENGTH = 8
+
+# Result cache: bytes before the checkpoint that must be unchanged to resume from it
+CACHE_FINGERPRINT_LEN = 4096
+
+# Arrow output: rows per record batch
+ARROW_BATCH_ROWS = 1 << 16
 
+
+class TrafficStats:
+    """Running aggregates for one pass over a capture.
+
+    Only counters are kept, so memory depends on the number of distinct
+    packet sizes, IPs and pairs, never on the number of packets. With
+    sketch_params the per-pair table and pair set are replaced by a
+    fixed-size PairSketch.
+    """
+
+    def __init__(self, sketch_params=None):
+        self.total_packets = 0
+        self.total_data = 0
+        self.min_size = None
+        self.max_size = None
+        self.size_counts = defaultdict(int)  # packet size -> number of packets
+        self.flows_by_src = defaultdict(int)    # Total flows where IP is source
+        self.flows_by_dst = defaultdict(int)    # Total flows where IP is destination
+        self.data_by_pair = defaultdict(int)    # Data transferred per (source IP:port, destination IP:port)
+        self.unique_pairs = set()               # Unique source-destination pairs
+        self.pair_sketch = PairSketch(**sketch_params) if sketch_params else None
+        self.end_offset = None  # File offset just past the last record counted (streaming paths)
+
+    def add_packet(self, packet_size):
+        self.total_packets += 1
+        self.total_data += packet_size
+        self.size_counts[packet_size] += 1
+        if self.min_size is None or packet_size < self.min_size:
+            self.min_size = packet_size
+        if self.max_size is None or packet_size > self.max_size:
+            self.max_size = packet_size
+
+    def add_flow(self, src_ip, src_port, dst_ip, dst_port, packet_size):
         # Create source-destination key (including ports)
         src_dst_key = (f"{src_ip}:{src_port}", f"{dst_ip}:{dst_port}")
+        self.flows_by_src[src_ip] += 1
+        self.flows_by_dst[dst_ip] += 1
+        if self.pair_sketch is not None:
+            self.pair_sketch.add(src_dst_key, packet_size)
+            return
+        self.unique_pairs.add(src_dst_key)
+        self.data_by_pair[src_dst_key] += packet_size
+
+    def merge(self, other):
+        """Fold in the counters of a later shard; merging shards in file order matches a single pass."""
+        self.total_packets += other.total_packets
+        self.total_data += other.total_data
+        if other.min_size is not None and (self.min_size is None or other.min_size < self.min_size):
+            self.min_size = other.min_size
+        if other.max_size is not None and (self.max_size is None or other.max_size > self.max_size):
+            self.max_size = other.max_size
+        for counter, other_counter in ((self.size_counts, other.size_counts),
+                                       (self.flows_by_src, other.flows_by_src),
+                                       (self.flows_by_dst, other.flows_by_dst),
+                                       (self.data_by_pair, other.data_by_pair)):
+            for key, value in other_counter.items():
+                counter[key] += value
+        self.unique_pairs |= other.unique_pairs
+        if self.pair_sketch is not None:
+            self.pair_sketch.merge(other.pair_sketch)
+        if other.end_offset is not None:
+            self.end_offset = other.end_offset
+
+
+def read_pcap_header(file):
+    """Read the global header, returning (byte order, timestamp scale, link type)."""
+    header = file.read(PCAP_GLOBAL_HEADER_LEN)
+    if len(header) < PCAP_GLOBAL_HEADER_LEN or header[:4] not in PCAP_MAGIC:
+        raise ValueError("Not a classic pcap file (pcapng is not supported in streaming mode)")
+    endian, ts_scale = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+    return endian, ts_scale, linktype
+
+
+def iter_pcap_records(pcap_file, start=None, end=None):
+    """Yield (link type, timestamp, raw bytes, end offset) for every record, reading one record at a time.
+
+    start/end restrict the walk to records whose header lies in [start, end);
+    start must be a record boundary. The end offset is the file position just
+    past the record, i.e. where the next record starts.
+    """
+    with open(pcap_file, "rb") as file:
+        endian, ts_scale, linktype = read_pcap_header(file)
+        record_header = struct.Struct(endian + "IIII")
+        position = PCAP_GLOBAL_HEADER_LEN if start is None else start
+        file.seek(position)
+        while end is None or position < end:
+            header = file.read(PCAP_RECORD_HEADER_LEN)
+            if len(header) < PCAP_RECORD_HEADER_LEN:
+                break
+            ts_sec, ts_frac, incl_len, _ = record_header.unpack(header)
+            data = file.read(incl_len)
+            if len(data) < incl_len:
+                break  # Truncated trailing record (file still being written)
+            position += PCAP_RECORD_HEADER_LEN + incl_len
+            yield linktype, ts_sec + ts_frac * ts_scale, data, position
+
+
+def ipv4_offset(linktype, data):
+    """Return the offset of the IPv4 header inside a frame, or None if it is not IPv4."""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        offset = 14
+        ethertype = (data[12] << 8) | data[13]
+        while ethertype in ETHERTYPE_VLAN and len(data) >= offset + 4:
+            ethertype = (data[offset + 2] << 8) | data[offset + 3]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None
+        offset, ethertype = 16, (data[14] << 8) | data[15]
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        if len(data) < 20:
+            return None
+        offset, ethertype = 20, (data[0] << 8) | data[1]
+    elif linktype in LINKTYPE_RAW:
+        offset, ethertype = 0, ETHERTYPE_IPV4
+    else:
+        return None
+    if ethertype != ETHERTYPE_IPV4 or len(data) < offset + 20 or data[offset] >> 4 != 4:
+        return None
+    return offset
+
+
+def tcp_ports_offset(data, ip_offset):
+    """Return the offset of the TCP header if this IPv4 packet carries TCP, else None."""
+    if data[ip_offset + 9] != IPPROTO_TCP:
+        return None
+    if ((data[ip_offset + 6] << 8) | data[ip_offset + 7]) & 0x1FFF:
+        return None  # Non-first fragment: no TCP header to read
+    tcp_offset = ip_offset + (data[ip_offset] & 0x0F) * 4
+    if len(data) < tcp_offset + 4:
+        return None
+    return tcp_offset
+
+
+def analyze_packets(packets, sketch_params=None):
+    """Original path: dissect fully loaded scapy packets."""
+    stats = TrafficStats(sketch_params)
+    print("\nProcessing packets...")
+    for pkt in tqdm(packets, desc="Analyzing", unit="pkt"):
+        packet_size = len(pkt)
+        stats.add_packet(packet_size)
+        if pkt.haslayer('IP') and pkt.haslayer('TCP'):
+            stats.add_flow(pkt['IP'].src, pkt['TCP'].sport, pkt['IP'].dst, pkt['TCP'].dport, packet_size)
+    return stats
+
+
+def stream_pcap(pcap_file, start=None, end=None, progress=True, sketch_params=None):
+    """Streaming path: decode headers straight from the file, one record at a time."""
+    stats = TrafficStats(sketch_params)
+    inet_ntoa, unpack_ports = socket.inet_ntoa, struct.Struct("!HH").unpack_from
+    if progress:
+        print("\nStreaming packets...")
+    stats.end_offset = PCAP_GLOBAL_HEADER_LEN if start is None else start
+    records = iter_pcap_records(pcap_file, start, end)
+    for linktype, _, data, stats.end_offset in tqdm(records, desc="Analyzing", unit="pkt", disable=not progress):
+        packet_size = len(data)
+        stats.add_packet(packet_size)
+        ip_offset = ipv4_offset(linktype, data)
+        if ip_offset is None:
+            continue
+        tcp_offset = tcp_ports_offset(data, ip_offset)
+        if tcp_offset is None:
+            continue
+        src_port, dst_port = unpack_ports(data, tcp_offset)
+        stats.add_flow(inet_ntoa(data[ip_offset + 12:ip_offset + 16]), src_port,
+                       inet_ntoa(data[ip_offset + 16:ip_offset + 20]), dst_port, packet_size)
+    return stats
+
+
+def index_pcap_records(pcap_file, start=None, end=None):
+    """Walk the record headers only, returning (link type, data offsets, timestamps, lengths).
+
+    start/end restrict the walk to records whose header lies in [start, end).
+    """
+    offsets, timestamps, lengths = array("q"), array("d"), array("I")
+    with open(pcap_file, "rb") as file:
+        endian, ts_scale, linktype = read_pcap_header(file)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            unpack_header = struct.Struct(endian + "IIII").unpack_from
+            position = PCAP_GLOBAL_HEADER_LEN if start is None else start
+            stop = len(raw) if end is None else min(end, len(raw))
+            while position < stop and position + PCAP_RECORD_HEADER_LEN <= len(raw):
+                ts_sec, ts_frac, incl_len, _ = unpack_header(raw, position)
+                position += PCAP_RECORD_HEADER_LEN
+                if position + incl_len > len(raw):
+                    break  # Truncated trailing record (file still being written)
+                offsets.append(position)
+                timestamps.append(ts_sec + ts_frac * ts_scale)
+                lengths.append(incl_len)
+                position += incl_len
+    return linktype, np.frombuffer(offsets, dtype=np.int64), np.frombuffer(timestamps), np.frombuffer(lengths, dtype=np.uint32)
+
+
+def gather_u8(raw, index, valid):
+    """Vectorized byte read at raw[index], yielding 0 wherever the read would run past the record."""
+    return np.where(valid, raw[np.where(valid, index, 0)], 0).astype(np.uint8)
+
+
+def gather_u16(raw, index, valid):
+    return (gather_u8(raw, index, valid).astype(np.uint16) << 8) | gather_u8(raw, index + 1, valid)
+
+
+def gather_u32(raw, index, valid):
+    return (gather_u16(raw, index, valid).astype(np.uint32) << 16) | gather_u16(raw, index + 2, valid)
+
+
+def build_packet_table(pcap_file, start=None, end=None, progress=True):
+    """Decode every record into NumPy columns.
+
+    Columns: ts (float64), length (uint32), src/dst (IPv4 as uint32), sport/dport
+    (uint16), proto (uint8, 0 for non-IPv4) and has_ports (transport header present).
+    Only the record headers are walked in Python; every field is gathered with
+    vectorized indexing into a memory-mapped view of the file.
+    """
+    if progress:
+        print("\nBuilding packet table...")
+    linktype, starts, ts, length = index_pcap_records(pcap_file, start, end)
+    raw = np.memmap(pcap_file, dtype=np.uint8, mode="r")
+    length64 = length.astype(np.int64)
+
+    if linktype == LINKTYPE_ETHERNET:
+        ip_offset = starts + 14
+        valid = length64 >= 14
+        ethertype = gather_u16(raw, starts + 12, valid)
+        for _ in range(2):  # Up to two stacked VLAN tags
+            tagged = np.isin(ethertype, ETHERTYPE_VLAN) & (ip_offset + 4 <= starts + length64)
+            ethertype = np.where(tagged, gather_u16(raw, ip_offset + 2, tagged), ethertype)
+            ip_offset = np.where(tagged, ip_offset + 4, ip_offset)
+    elif linktype == LINKTYPE_LINUX_SLL:
+        ip_offset = starts + 16
+        ethertype = gather_u16(raw, starts + 14, length64 >= 16)
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        ip_offset = starts + 20
+        ethertype = gather_u16(raw, starts, length64 >= 20)
+    elif linktype in LINKTYPE_RAW:
+        ip_offset = starts
+        ethertype = np.full(len(starts), ETHERTYPE_IPV4, dtype=np.uint16)
+    else:
+        raise ValueError(f"Unsupported link type {linktype}")
+
+    end = starts + length64
+    is_ipv4 = (ethertype == ETHERTYPE_IPV4) & (ip_offset + 20 <= end)
+    is_ipv4 &= (gather_u8(raw, ip_offset, is_ipv4) >> 4) == 4
+    proto = gather_u8(raw, ip_offset + 9, is_ipv4)
+    first_fragment = (gather_u16(raw, ip_offset + 6, is_ipv4) & 0x1FFF) == 0
+    l4_offset = ip_offset + (gather_u8(raw, ip_offset, is_ipv4) & 0x0F).astype(np.int64) * 4
+    has_ports = is_ipv4 & first_fragment & np.isin(proto, (IPPROTO_TCP, IPPROTO_UDP)) & (l4_offset + 4 <= end)
+
+    return {
+        "ts": ts,
+        "length": length,
+        "src": gather_u32(raw, ip_offset + 12, is_ipv4),
+        "dst": gather_u32(raw, ip_offset + 16, is_ipv4),
+        "sport": gather_u16(raw, l4_offset, has_ports),
+        "dport": gather_u16(raw, l4_offset + 2, has_ports),
+        "proto": proto,
+        "has_ports": has_ports,
+    }
+
+
+def group_by_first_seen(keys, weights=None):
+    """Vectorized group-by returning (unique keys, counts or weight sums) in first-seen order."""
+    unique, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=weights, minlength=len(unique))
+    order = np.argsort(first_index, kind="stable")
+    return unique[order], totals[order].astype(np.int64)
+
+
+def ip_to_str(ip):
+    return socket.inet_ntoa(struct.pack("!I", int(ip)))
+
+
+def stats_from_table(table):
+    """Compute every aggregate in TrafficStats from the columnar table."""
+    stats = TrafficStats()
+    length = table["length"]
+    if len(length) == 0:
+        return stats
+    stats.total_packets = len(length)
+    stats.total_data = int(length.sum(dtype=np.uint64))
+    stats.min_size, stats.max_size = int(length.min()), int(length.max())
+    sizes, size_counts = np.unique(length, return_counts=True)
+    stats.size_counts.update(zip(sizes.tolist(), size_counts.tolist()))
+
+    tcp = table["has_ports"] & (table["proto"] == IPPROTO_TCP)
+    src, dst = table["src"][tcp], table["dst"][tcp]
+    for column, counter in ((src, stats.flows_by_src), (dst, stats.flows_by_dst)):
+        ips, counts = group_by_first_seen(column)
+        counter.update(zip(map(ip_to_str, ips), counts.tolist()))
+
+    # Pack (src ip, src port) and (dst ip, dst port) into one 16-byte key per packet
+    pair_keys = np.empty((len(src), 2), dtype=np.uint64)
+    pair_keys[:, 0] = (src.astype(np.uint64) << 16) | table["sport"][tcp]
+    pair_keys[:, 1] = (dst.astype(np.uint64) << 16) | table["dport"][tcp]
+    pair_keys = pair_keys.view(np.dtype((np.void, 16))).ravel()
+    pairs, pair_bytes = group_by_first_seen(pair_keys, weights=length[tcp])
+    for (src_key, dst_key), data in zip(pairs.view(np.uint64).reshape(-1, 2).tolist(), pair_bytes.tolist()):
+        src_dst_key = (f"{ip_to_str(src_key >> 16)}:{src_key & 0xFFFF}", f"{ip_to_str(dst_key >> 16)}:{dst_key & 0xFFFF}")
+        stats.data_by_pair[src_dst_key] = data
+    stats.unique_pairs.update(stats.data_by_pair)
+    return stats
+
 
-        # Add to unique pairs set
-        unique_pairs.add(src_dst_key)
+def is_record_boundary(raw, position, unpack_header, snaplen, first_ts):
+    """Check that a chain of plausible record headers starts at position."""
+    for _ in range(BOUNDARY_CHAIN_LENGTH):
+        if position + PCAP_RECORD_HEADER_LEN > len(raw):
+            return True  # Ran into the end of the file (possibly mid-record)
+        ts_sec, ts_frac, incl_len, orig_len = unpack_header(raw, position)
+        if incl_len > snaplen or incl_len > orig_len or ts_frac >= 1_000_000_000 or not first_ts <= ts_sec < first_ts + 10 * 365 * 86400:
+            return False
+        position += PCAP_RECORD_HEADER_LEN + incl_len
+    return True
 
-        # Count flows by IP
-        flows_by_src[src_ip] += 1
-        flows_by_dst[dst_ip] += 1
 
-        # Track data transferred per source-destination pair
-        data_by_pair[src_dst_key] += packet_size
+def shard_boundaries(pcap_file, shards, start=PCAP_GLOBAL_HEADER_LEN):
+    """Split a pcap (from record boundary `start` on) into roughly equal byte
+    ranges that start on record boundaries.
+
+    Each cut point is found by scanning forward from the target offset for a
+    chain of valid record headers, so only a few bytes per shard are read.
+    """
+    with open(pcap_file, "rb") as file:
+        endian = read_pcap_header(file)[0]
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            unpack_header = struct.Struct(endian + "IIII").unpack_from
+            snaplen = struct.unpack_from(endian + "I", raw, 16)[0] or 0xFFFFFFFF
+            if len(raw) < start + PCAP_RECORD_HEADER_LEN:
+                return [start, len(raw)]
+            first_ts = unpack_header(raw, PCAP_GLOBAL_HEADER_LEN)[0] - 86400
+            size = len(raw) - start
+            boundaries = [start]
+            for shard in range(1, shards):
+                position = max(start + size * shard // shards, boundaries[-1] + 1)
+                while position < len(raw) and not is_record_boundary(raw, position, unpack_header, snaplen, first_ts):
+                    position += 1
+                if position >= len(raw):
+                    break
+                boundaries.append(position)
+            boundaries.append(len(raw))
+    return boundaries
+
+
+def analyze_shard(pcap_file, start, end, columnar, sketch_params):
+    if columnar:
+        return stats_from_table(build_packet_table(pcap_file, start, end, progress=False))
+    return stream_pcap(pcap_file, start, end, progress=False, sketch_params=sketch_params)
+
+
+def parallel_analysis(pcap_file, workers, columnar=False, sketch_params=None, start=PCAP_GLOBAL_HEADER_LEN):
+    """Analyze shards of one pcap in a process pool and merge them in file order."""
+    boundaries = shard_boundaries(pcap_file, workers * SHARDS_PER_WORKER, start)
+    starts, ends = boundaries[:-1], boundaries[1:]
+    print(f"\nAnalyzing {len(starts)} shards on {workers} workers...")
+    stats = TrafficStats(sketch_params)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_results = executor.map(analyze_shard, repeat(pcap_file), starts, ends, repeat(columnar), repeat(sketch_params))
+        for shard_stats in tqdm(shard_results, total=len(starts), desc="Merging", unit="shard"):
+            stats.merge(shard_stats)
+    return stats
+
+
+def file_fingerprint(file, offset, length):
+    file.seek(offset)
+    return hashlib.sha256(file.read(length)).hexdigest()
+
+
+def cache_path(pcap_file, cache_dir, sketch_params):
+    """Content-addressed cache location: hash of the pcap header and first record plus the analysis mode."""
+    with open(pcap_file, "rb") as file:
+        endian = read_pcap_header(file)[0]
+        record_header = file.read(PCAP_RECORD_HEADER_LEN)
+        if len(record_header) < PCAP_RECORD_HEADER_LEN:
+            return None  # No complete record yet
+        head_length = PCAP_GLOBAL_HEADER_LEN + PCAP_RECORD_HEADER_LEN + struct.unpack_from(endian + "I", record_header, 8)[0]
+        head_hash = file_fingerprint(file, 0, head_length)
+    mode = "exact" if sketch_params is None else "approx_" + "_".join(f"{key}{value}" for key, value in sorted(sketch_params.items()))
+    return os.path.join(cache_dir, f"{head_hash[:32]}_{mode}.pkl")
+
+
+def load_checkpoint(path, pcap_file):
+    """Return cached stats if the file still contains the checkpointed bytes unchanged, else None."""
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+    stats = checkpoint["stats"]
+    if os.path.getsize(pcap_file) < stats.end_offset:
+        return None  # File was truncated or replaced
+    fingerprint_start = max(0, stats.end_offset - CACHE_FINGERPRINT_LEN)
+    with open(pcap_file, "rb") as file:
+        if file_fingerprint(file, fingerprint_start, stats.end_offset - fingerprint_start) != checkpoint["fingerprint"]:
+            return None  # Earlier records were rewritten
+    return stats
+
+
+def save_checkpoint(path, pcap_file, stats):
+    fingerprint_start = max(0, stats.end_offset - CACHE_FINGERPRINT_LEN)
+    with open(pcap_file, "rb") as file:
+        fingerprint = file_fingerprint(file, fingerprint_start, stats.end_offset - fingerprint_start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump({"stats": stats, "fingerprint": fingerprint}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)  # Atomic, so concurrent readers never see a partial checkpoint
+
+
+def cached_analysis(pcap_file, cache_dir, workers=1, sketch_params=None):
+    """Resume from the cached aggregates and only process records appended since the checkpoint."""
+    path = cache_path(pcap_file, cache_dir, sketch_params)
+    stats = load_checkpoint(path, pcap_file)
+    start = PCAP_GLOBAL_HEADER_LEN
+    if stats is None:
+        print("\nNo valid checkpoint, analyzing the whole capture.")
+        stats = TrafficStats(sketch_params)
+    else:
+        start = stats.end_offset
+        print(f"\nResuming from checkpoint at byte {start} ({stats.total_packets} packets cached).")
+
+    if workers > 1:
+        stats.merge(parallel_analysis(pcap_file, workers, sketch_params=sketch_params, start=start))
+    else:
+        stats.merge(stream_pcap(pcap_file, start=start, sketch_params=sketch_params))
+    if path is not None:
+        save_checkpoint(path, pcap_file, stats)
+    return stats
+
+
+def print_size_stats(stats):
+    avg_size = stats.total_data / stats.total_packets
+    print(f"Total Packets: {stats.total_packets}")
+    print(f"Total Data: {stats.total_data} bytes")
+    print(f"Min Packet Size: {stats.min_size} bytes")
+    print(f"Max Packet Size: {stats.max_size} bytes")
+    print(f"Average Packet Size: {avg_size:.2f} bytes")
+
+
+def plot_size_histogram(stats):
+    sizes = list(stats.size_counts)
+    plt.hist(sizes, bins=20, weights=[stats.size_counts[size] for size in sizes], color='blue', edgecolor='black')
+    plt.title("Packet Size Distribution")
+    plt.xlabel("Packet Size (bytes)")
+    plt.ylabel("Frequency")
+    plt.show()
+
 
-# Step 5: Save dictionaries to CSV files
 def save_dict_to_csv(dictionary, filename, header):
     with open(filename, mode='w', newline='') as file:
         writer = csv.writer(file)
@@ -67,30 +504,165 @@ def save_dict_to_csv(dictionary, filename, header):
         for key, value in dictionary.items():
             writer.writerow([key, value])
 
-# Save flows by source IP
-save_dict_to_csv(flows_by_src, "flows_by_source.csv", ["Source IP", "Flow Count"])
-
-# Save flows by destination IP
-save_dict_to_csv(flows_by_dst, "flows_by_destination.csv", ["Destination IP", "Flow Count"])
-
-# Save data transferred per source-destination pair
-with open("data_transferred.csv", mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Source:Port", "Destination:Port", "Data Transferred (bytes)"])
-    for (src, dst), data in data_by_pair.items():
-        writer.writerow([src, dst, data])
-
-# Save unique source-destination pairs
-with open("unique_pairs.csv", mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Source:Port", "Destination:Port"])
-    for src, dst in unique_pairs:
-        writer.writerow([src, dst])
-
-# Step 6: Find the source-destination pair that transferred the most data
-top_src_dst_pair = max(data_by_pair, key=data_by_pair.get)
-top_data_transferred = data_by_pair[top_src_dst_pair]
-
-print(f"\nTop Source-Destination Pair: {top_src_dst_pair} transferred {top_data_transferred} bytes.")
-print("Dictionaries saved to CSV files successfully.")
-print(f"Total Unique Source-Destination Pairs: {len(unique_pairs)}")
+
+def save_results(stats, top_k=None):
+    # Save flows by source IP
+    save_dict_to_csv(stats.flows_by_src, "flows_by_source.csv", ["Source IP", "Flow Count"])
+
+    # Save flows by destination IP
+    save_dict_to_csv(stats.flows_by_dst, "flows_by_destination.csv", ["Destination IP", "Flow Count"])
+
+    if stats.pair_sketch is not None:
+        # Only the heaviest pairs are known in approximate mode
+        with open("data_transferred.csv", mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Source:Port", "Destination:Port", "Data Transferred (bytes)", "Max Overestimate (bytes)"])
+            for (src, dst), data, error in stats.pair_sketch.top(top_k):
+                writer.writerow([src, dst, data, error])
+        print("Approximate mode: unique_pairs.csv not written (only the distinct pair count is kept).")
+        return
+
+    # Save data transferred per source-destination pair
+    with open("data_transferred.csv", mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Source:Port", "Destination:Port", "Data Transferred (bytes)"])
+        for (src, dst), data in stats.data_by_pair.items():
+            writer.writerow([src, dst, data])
+
+    # Save unique source-destination pairs
+    with open("unique_pairs.csv", mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Source:Port", "Destination:Port"])
+        for src, dst in stats.unique_pairs:
+            writer.writerow([src, dst])
+
+
+def ip_to_int(ip):
+    return struct.unpack("!I", socket.inet_aton(ip))[0]
+
+
+def split_endpoint(endpoint):
+    ip, port = endpoint.rsplit(":", 1)
+    return ip_to_int(ip), int(port)
+
+
+def write_arrow_table(filename, schema, rows, compression):
+    """Write rows to an Arrow IPC file in record batches of ARROW_BATCH_ROWS."""
+    import pyarrow as pa
+    options = pa.ipc.IpcWriteOptions(compression=None if compression == "none" else compression)
+    with pa.OSFile(filename, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        columns = [[] for _ in schema]
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) == ARROW_BATCH_ROWS:
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+                columns = [[] for _ in schema]
+        if columns[0] or writer.stats.num_record_batches == 0:
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+
+def save_results_arrow(stats, top_k=None, compression="zstd"):
+    """Write the four result tables as compressed Arrow IPC files with integer-typed IPs and ports.
+
+    Load them back with pyarrow.ipc.open_file(pyarrow.memory_map(path)); with
+    compression="none" the columns are used in place without copying.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise SystemExit("Arrow output requires pyarrow (pip install pyarrow)")
+
+    for counter, filename, ip_column in ((stats.flows_by_src, "flows_by_source.arrow", "src_ip"),
+                                         (stats.flows_by_dst, "flows_by_destination.arrow", "dst_ip")):
+        schema = pa.schema([(ip_column, pa.uint32()), ("flow_count", pa.uint64())])
+        write_arrow_table(filename, schema, ((ip_to_int(ip), count) for ip, count in counter.items()), compression)
+
+    pair_fields = [("src_ip", pa.uint32()), ("src_port", pa.uint16()), ("dst_ip", pa.uint32()), ("dst_port", pa.uint16())]
+    if stats.pair_sketch is not None:
+        schema = pa.schema(pair_fields + [("bytes", pa.uint64()), ("max_overestimate", pa.uint64())])
+        rows = ((*split_endpoint(src), *split_endpoint(dst), data, error)
+                for (src, dst), data, error in stats.pair_sketch.top(top_k))
+        write_arrow_table("data_transferred.arrow", schema, rows, compression)
+        print("Approximate mode: unique_pairs.arrow not written (only the distinct pair count is kept).")
+        return
+
+    schema = pa.schema(pair_fields + [("bytes", pa.uint64())])
+    rows = ((*split_endpoint(src), *split_endpoint(dst), data) for (src, dst), data in stats.data_by_pair.items())
+    write_arrow_table("data_transferred.arrow", schema, rows, compression)
+    rows = ((*split_endpoint(src), *split_endpoint(dst)) for src, dst in stats.unique_pairs)
+    write_arrow_table("unique_pairs.arrow", pa.schema(pair_fields), rows, compression)
+
+
+def print_top_pair(stats, output_format="csv"):
+    if stats.pair_sketch is not None:
+        (top_src_dst_pair, top_data_transferred, error), = stats.pair_sketch.top(1)
+        print(f"\nTop Source-Destination Pair: {top_src_dst_pair} transferred ~{top_data_transferred} bytes (max overestimate {error}).")
+        print(f"Dictionaries saved to {output_format.upper()} files successfully.")
+        print(f"Estimated Unique Source-Destination Pairs: {stats.pair_sketch.distinct_count()}")
+        return
+
+    # Find the source-destination pair that transferred the most data
+    top_src_dst_pair = max(stats.data_by_pair, key=stats.data_by_pair.get)
+    top_data_transferred = stats.data_by_pair[top_src_dst_pair]
+
+    print(f"\nTop Source-Destination Pair: {top_src_dst_pair} transferred {top_data_transferred} bytes.")
+    print(f"Dictionaries saved to {output_format.upper()} files successfully.")
+    print(f"Total Unique Source-Destination Pairs: {len(stats.unique_pairs)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract packet size and flow statistics from a pcap file.")
+    parser.add_argument("--pcap", default="Captured.pcap", help="Path to the pcap file to analyze")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream records from disk instead of loading every packet with rdpcap (constant memory)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Decode the capture into NumPy columns and compute every statistic with vectorized group-bys")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Split the pcap into shards and analyze them in this many processes")
+    parser.add_argument("--approx", action="store_true",
+                        help="Track pairs with fixed-memory sketches (Space-Saving/Count-Min top talkers, HyperLogLog distinct count)")
+    parser.add_argument("--epsilon", type=float, default=1e-4,
+                        help="Approximate mode: per-pair byte estimates are within epsilon * total bytes")
+    parser.add_argument("--delta", type=float, default=1e-3,
+                        help="Approximate mode: probability that a Count-Min estimate exceeds the epsilon bound")
+    parser.add_argument("--hll_error", type=float, default=0.01,
+                        help="Approximate mode: relative standard error of the distinct pair count")
+    parser.add_argument("--top_k", type=int, default=100,
+                        help="Approximate mode: number of heaviest pairs written to data_transferred.csv")
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep per-file aggregates on disk and only analyze records appended since the last run")
+    parser.add_argument("--cache_dir", default=".analysis_cache", help="Directory for cached aggregates")
+    parser.add_argument("--output_format", choices=["csv", "arrow"], default="csv",
+                        help="csv: the four CSV files; arrow: compressed, typed Arrow IPC files (needs pyarrow)")
+    parser.add_argument("--compression", choices=["zstd", "lz4", "none"], default="zstd",
+                        help="Compression codec for --output_format arrow")
+    args = parser.parse_args()
+    if args.approx and args.columnar:
+        parser.error("--approx cannot be combined with --columnar (the columnar table is already exact in memory)")
+    if args.cache and args.columnar:
+        parser.error("--cache resumes the streaming engine and cannot be combined with --columnar")
+
+    sketch_params = dict(epsilon=args.epsilon, delta=args.delta, hll_error=args.hll_error) if args.approx else None
+    if args.cache:
+        stats = cached_analysis(args.pcap, args.cache_dir, args.workers, sketch_params)
+    elif args.workers > 1:
+        stats = parallel_analysis(args.pcap, args.workers, args.columnar, sketch_params)
+    elif args.columnar:
+        stats = stats_from_table(build_packet_table(args.pcap))
+    elif args.stream:
+        stats = stream_pcap(args.pcap, sketch_params=sketch_params)
+    else:
+        stats = analyze_packets(rdpcap(args.pcap), sketch_params)
+
+    print_size_stats(stats)
+    plot_size_histogram(stats)
+    if args.output_format == "arrow":
+        save_results_arrow(stats, args.top_k, args.compression)
+    else:
+        save_results(stats, args.top_k)
+    print_top_pair(stats, args.output_format)
+
+
+if __name__ == "__main__":
+    main()
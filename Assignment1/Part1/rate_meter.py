@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+
+
+class RateMeter:
+    """Constant-time packet/byte rate meter.
+
+    Traffic is accumulated into a ring of fixed-width time buckets. The
+    sliding-window totals are kept as running sums (expired buckets are
+    subtracted as the ring advances) and an EWMA rate is folded in once per
+    completed bucket, so both update() and the rate queries are O(1)
+    regardless of how many packets have been seen.
+    """
+
+    def __init__(self, window=5.0, resolution=0.1, ewma_tau=5.0, clock=time.monotonic):
+        self.resolution = resolution
+        self.slots = max(1, int(round(window / resolution)))
+        self.window = self.slots * resolution
+        self.alpha = 1 - math.exp(-resolution / ewma_tau)
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.start_time = clock()
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.bucket_packets = [0] * self.slots
+        self.bucket_bytes = [0] * self.slots
+        self.window_packets = 0
+        self.window_bytes = 0
+        self.current_bucket = 0
+        self.ewma_pps = 0.0
+        self.ewma_bps = 0.0
+
+    def _bucket(self, now):
+        return int((now - self.start_time) / self.resolution)
+
+    def _advance(self, now):
+        """Roll the ring forward to the bucket containing `now`."""
+        bucket = self._bucket(now)
+        elapsed = bucket - self.current_bucket
+        if elapsed <= 0:
+            return
+        # Fold the bucket that just completed into the EWMA, then decay over the empty ones
+        slot = self.current_bucket % self.slots
+        self.ewma_pps += self.alpha * (self.bucket_packets[slot] / self.resolution - self.ewma_pps)
+        self.ewma_bps += self.alpha * (self.bucket_bytes[slot] * 8 / self.resolution - self.ewma_bps)
+        decay = (1 - self.alpha) ** (elapsed - 1)
+        self.ewma_pps *= decay
+        self.ewma_bps *= decay
+        # Expire at most one full ring of buckets
+        for step in range(1, min(elapsed, self.slots) + 1):
+            slot = (self.current_bucket + step) % self.slots
+            self.window_packets -= self.bucket_packets[slot]
+            self.window_bytes -= self.bucket_bytes[slot]
+            self.bucket_packets[slot] = 0
+            self.bucket_bytes[slot] = 0
+        self.current_bucket = bucket
+
+    def update(self, nbytes, now=None):
+        """Record one packet of `nbytes` bytes."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            self._advance(now)
+            slot = self.current_bucket % self.slots
+            self.bucket_packets[slot] += 1
+            self.bucket_bytes[slot] += nbytes
+            self.window_packets += 1
+            self.window_bytes += nbytes
+            self.total_packets += 1
+            self.total_bytes += nbytes
+
+    def window_counts(self, now=None):
+        """Return (packets, bytes) seen within the sliding window."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            self._advance(now)
+            return self.window_packets, self.window_bytes
+
+    def window_rates(self, now=None):
+        """Return (PPS, Mbps) over the sliding window."""
+        now = self.clock() if now is None else now
+        packets, nbytes = self.window_counts(now)
+        # The window holds the current (partial) bucket plus the slots - 1 before it
+        elapsed = now - self.start_time
+        span = min(elapsed, (self.slots - 1) * self.resolution + elapsed - self.current_bucket * self.resolution)
+        if span <= 0:
+            return 0.0, 0.0
+        return packets / span, nbytes * 8 / (span * 1e6)
+
+    def ewma_rates(self, now=None):
+        """Return exponentially weighted (PPS, Mbps), smoothed over roughly ewma_tau seconds."""
+        with self.lock:
+            self._advance(self.clock() if now is None else now)
+            return self.ewma_pps, self.ewma_bps / 1e6
+
+    def average_rates(self, now=None):
+        """Return (PPS, Mbps) averaged since the meter was created."""
+        now = self.clock() if now is None else now
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.total_packets / elapsed, self.total_bytes * 8 / (elapsed * 1e6)
@@ -0,0 +1,184 @@
+import hashlib
+import heapq
+import math
+from array import array
+
+
+def hash128(key):
+    """Return two independent 64-bit hashes of a bytes key (stable across processes)."""
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class CountMinSketch:
+    """Count-Min sketch: estimates never undercount and overcount by at most
+    epsilon * (total weight) with probability 1 - delta."""
+
+    def __init__(self, epsilon=1e-4, delta=1e-3):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = array("Q", bytes(8 * self.width * self.depth))
+        self.total = 0
+
+    def _cells(self, h1, h2):
+        # Kirsch-Mitzenmacher: derive every row's hash from two base hashes
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, h1, h2, weight=1):
+        table = self.table
+        for cell in self._cells(h1, h2):
+            table[cell] += weight
+        self.total += weight
+
+    def estimate(self, h1, h2):
+        table = self.table
+        return min(table[cell] for cell in self._cells(h1, h2))
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must have the same dimensions to be merged")
+        table = self.table
+        for cell, value in enumerate(other.table):
+            if value:
+                table[cell] += value
+        self.total += other.total
+
+
+class SpaceSaving:
+    """Weighted Space-Saving summary of the heaviest keys.
+
+    Holds at most `capacity` counters. Every key heavier than total/capacity is
+    guaranteed to be tracked, and each count overestimates the true weight by at
+    most its recorded error (itself at most total/capacity).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []  # (count, key), one entry per tracked key; may lag behind counts
+
+    def _pop_min(self):
+        counts, heap = self.counts, self.heap
+        while True:
+            count, key = heapq.heappop(heap)
+            if counts[key] == count:
+                return key
+            heapq.heappush(heap, (counts[key], key))  # Stale entry: reinsert with the current count
+
+    def min_count(self):
+        """Weight any untracked key may have (0 until the summary is full)."""
+        if len(self.counts) < self.capacity:
+            return 0
+        key = self._pop_min()
+        heapq.heappush(self.heap, (self.counts[key], key))
+        return self.counts[key]
+
+    def add(self, key, weight=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += weight
+        elif len(counts) < self.capacity:
+            counts[key] = weight
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (weight, key))
+        else:
+            evicted = self._pop_min()
+            floor = counts.pop(evicted)
+            del self.errors[evicted]
+            counts[key] = floor + weight
+            self.errors[key] = floor
+            heapq.heappush(self.heap, (floor + weight, key))
+
+    def top(self, k):
+        """Return [(key, count, error)] for the k heaviest tracked keys."""
+        return [(key, count, self.errors[key])
+                for key, count in heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])]
+
+    def merge(self, other):
+        """Combine two summaries; untracked keys are charged the other side's minimum."""
+        self_floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for key in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(key, self_floor) + other.counts.get(key, other_floor)
+            error = self.errors.get(key, self_floor) + other.errors.get(key, other_floor)
+            merged[key] = (count, error)
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counts = {key: count for key, (count, _) in kept}
+        self.errors = {key: error for key, (_, error) in kept}
+        self.heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self.heap)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with a relative standard error of about `error`."""
+
+    def __init__(self, error=0.01):
+        self.precision = min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+        self.size = 1 << self.precision
+        self.registers = bytearray(self.size)
+
+    def add(self, h):
+        suffix_bits = 64 - self.precision
+        index = h >> suffix_bits
+        rank = suffix_bits - (h & ((1 << suffix_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.size
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        if self.size != other.size:
+            raise ValueError("HyperLogLog counters must have the same precision to be merged")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+
+class PairSketch:
+    """Fixed-memory replacement for exact per-pair byte totals and the unique pair set.
+
+    Space-Saving tracks the heaviest pairs, Count-Min tightens their byte
+    estimates and HyperLogLog counts distinct pairs. All three are mergeable,
+    so sketches built on separate shards or capture files can be combined.
+    """
+
+    def __init__(self, epsilon=1e-4, delta=1e-3, hll_error=0.01):
+        self.heavy = SpaceSaving(math.ceil(1 / epsilon))
+        self.bytes = CountMinSketch(epsilon, delta)
+        self.distinct = HyperLogLog(hll_error)
+
+    @staticmethod
+    def _hash(key):
+        return hash128("\x00".join(key).encode())
+
+    def add(self, key, weight):
+        h1, h2 = self._hash(key)
+        self.heavy.add(key, weight)
+        self.bytes.add(h1, h2, weight)
+        self.distinct.add(h1)
+
+    def top(self, k):
+        """Return [(key, estimated bytes, max overestimate)] for the k heaviest pairs."""
+        result = []
+        for key, count, error in self.heavy.top(self.heavy.capacity):
+            estimate = min(count, self.bytes.estimate(*self._hash(key)))
+            result.append((key, estimate, estimate - (count - error)))
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result[:k]
+
+    def distinct_count(self):
+        return self.distinct.count()
+
+    def merge(self, other):
+        self.heavy.merge(other.heavy)
+        self.bytes.merge(other.bytes)
+        self.distinct.merge(other.distinct)
@@ -1,62 +1,173 @@
 from scapy.all import sniff, wrpcap
+from scapy.utils import PcapWriter
+from collections import deque
+import argparse
+import os
 import threading
 import time
+from rate_meter import RateMeter
+from tpacket_v3 import Frame, LINKTYPE_ETHERNET, TPacketV3Capture
 
 # Global variables to store captured packets and count total packets
 captured_packets = []
+recent_packets = None  # Bounded ring of recent packets (rotating capture mode only)
+pcap_writer = None     # RotatingPcapWriter (rotating capture mode only)
 total_packets = 0  # Counter for total packets captured
-start_time = time.time()  # Start time to calculate the PPS and Mbps
+REPORT_INTERVAL = 5  # Seconds between periodic reports
+rate_meter = RateMeter(window=REPORT_INTERVAL)  # Running counters for PPS and Mbps
+
+
+class RotatingPcapWriter:
+    """Stream packets to a sequence of pcap segments, rotating by size or age.
+
+    Each segment is closed (and therefore complete on disk) before the next
+    one is opened, so a crash can only lose the segment being written.
+    """
+
+    def __init__(self, directory, prefix="captured_packets", max_bytes=None, max_seconds=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.segment_index = 0
+        self.writer = None
+        self.path = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, pkt):
+        self.segment_index += 1
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{self.segment_index:04d}.pcap")
+        # Raw tpacket frames are always Ethernet; for scapy packets the writer infers the linktype
+        # (cooked SLL, loopback, raw IP...) from the first packet of the segment
+        linktype = LINKTYPE_ETHERNET if isinstance(pkt, Frame) else None
+        self.writer = PcapWriter(self.path, linktype=linktype, sync=False)
+        self.segment_bytes = 0
+        self.segment_start = time.time()
+
+    def _segment_full(self):
+        if self.max_bytes is not None and self.segment_bytes >= self.max_bytes:
+            return True
+        return self.max_seconds is not None and time.time() - self.segment_start >= self.max_seconds
+
+    def write(self, pkt):
+        if self.writer is None:
+            self._open_segment(pkt)
+        elif self._segment_full():
+            self.close()
+            print(f"\nSegment saved to {self.path}")
+            self._open_segment(pkt)
+        if isinstance(pkt, Frame):
+            # Write the raw bytes without dissecting the frame
+            if not self.writer.header_present:
+                self.writer.write_header(None)
+            sec = int(pkt.time)
+            self.writer.write_packet(pkt.data, sec=sec, usec=int((pkt.time - sec) * 1e6), wirelen=pkt.wirelen)
+        else:
+            self.writer.write(pkt)
+        self.segment_bytes += len(pkt) + 16  # Record header + packet bytes
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
 
 # Function to capture packets
 def packet_handler(pkt):
     global captured_packets, total_packets
-    captured_packets.append(pkt)
+    if pcap_writer is not None:
+        pcap_writer.write(pkt)
+        recent_packets.append(pkt)
+    else:
+        captured_packets.append(pkt)
     total_packets += 1  # Increment total count
+    rate_meter.update(len(pkt))
     # print(pkt.summary())  # Optional, to see packet summary during capture
 
 # Function to print packets every 5 seconds and calculate speed
 def print_packets_periodically():
     while True:
-        time.sleep(5)  # Wait for 5 seconds
-        if captured_packets:
-            print(f"\nCaptured {len(captured_packets)} packets in the last 5 seconds.")
+        time.sleep(REPORT_INTERVAL)  # Wait for one report interval
+        window_packets, _ = rate_meter.window_counts()
+        if window_packets:
+            pps, mbps = rate_meter.window_rates()
+            ewma_pps, ewma_mbps = rate_meter.ewma_rates()
+            print(f"\nCaptured {window_packets} packets in the last {REPORT_INTERVAL} seconds.")
+            print(f"Rate: {pps:.2f} pps, {mbps:.2f} Mbps (EWMA: {ewma_pps:.2f} pps, {ewma_mbps:.2f} Mbps)")
             print(f"📌 Total packets captured so far: {total_packets}")  # Print total count
         else:
-            print("\nNo packets captured in the last 5 seconds.")
+            print(f"\nNo packets captured in the last {REPORT_INTERVAL} seconds.")
             print(f"📌 Total packets captured so far: {total_packets}")  # Print total count
 
 # Function to calculate PPS (Packets Per Second) and Mbps (Megabits Per Second)
 def calculate_speed():
-    global start_time, total_packets
-    current_time = time.time()
-    elapsed_time = current_time - start_time  # Total time elapsed in seconds
-    pps = total_packets / elapsed_time  # Packets per second
-    total_bytes = sum(len(pkt) for pkt in captured_packets)  # Total bytes captured
-    mbps = (total_bytes * 8) / (elapsed_time * 1e6)  # Convert bytes to Megabits per second
-    return pps, mbps
+    return rate_meter.average_rates()  # Averaged since the start of the capture
 
 # Function to save packets to a pcap file at the end
 def save_to_pcap():
+    if pcap_writer is not None:
+        pcap_writer.close()
+        if pcap_writer.path is None:  # No segment was ever opened
+            print("\nNo packets were captured.")
+        else:
+            print(f"\nLast segment saved to {pcap_writer.path}")
+        return
     print("\nSaving captured packets to file...")
-    wrpcap("captured_packets.pcap", captured_packets)  # Write to pcap file
+    packets = [pkt.packet if isinstance(pkt, Frame) else pkt for pkt in captured_packets]
+    wrpcap("captured_packets.pcap", packets)  # Write to pcap file
     print("Captured packets saved to captured_packets.pcap")
 
-# Start the periodic print function in a separate thread
-threading.Thread(target=print_packets_periodically, daemon=True).start()
-
-# Start sniffing packets
-try:
-    print("Sniffing packets... (Press Ctrl+C to stop)")
-    sniff(iface="eth0", prn=packet_handler, store=False)
-except KeyboardInterrupt:
-    print("\nCapture stopped manually by user.")
-
-# After capture ends, calculate PPS and Mbps
-pps, mbps = calculate_speed()
-print(f"\nCapture session finished.")
-print(f"Total packets captured: {total_packets}")
-print(f"Total PPS (Packets Per Second): {pps:.2f} pps")
-print(f"Total Mbps (Megabits Per Second): {mbps:.2f} Mbps")
-
-# Save captured packets to a pcap file
-save_to_pcap()
+def main():
+    global recent_packets, pcap_writer
+    parser = argparse.ArgumentParser(description="Capture packets with scapy and report PPS/Mbps.")
+    parser.add_argument("--iface", default="eth0", help="Interface to sniff on")
+    parser.add_argument("--backend", choices=["scapy", "tpacket"], default="scapy",
+                        help="scapy: sniff() with per-packet dissection; tpacket: Linux PACKET_MMAP TPACKET_V3 ring with lazy dissection")
+    parser.add_argument("--bpf", default=None, help="Kernel BPF filter expression, e.g. 'tcp port 80' (tpacket backend)")
+    parser.add_argument("--snaplen", type=int, default=262144, help="Bytes captured per frame (tpacket backend)")
+    parser.add_argument("--block_size", type=int, default=1 << 22, help="Ring block size in bytes (tpacket backend)")
+    parser.add_argument("--block_count", type=int, default=64, help="Number of ring blocks (tpacket backend)")
+    parser.add_argument("--rotate", action="store_true",
+                        help="Stream packets to rotating pcap segments instead of buffering the whole capture")
+    parser.add_argument("--output_dir", default="captures", help="Directory for rotated pcap segments")
+    parser.add_argument("--rotate_mb", type=float, default=100, help="Rotate the segment after this many megabytes")
+    parser.add_argument("--rotate_seconds", type=float, default=None, help="Rotate the segment after this many seconds")
+    parser.add_argument("--ring_size", type=int, default=10000,
+                        help="Number of recent packets kept in memory for live inspection in rotating mode")
+    args = parser.parse_args()
+
+    if args.rotate:
+        recent_packets = deque(maxlen=args.ring_size)
+        pcap_writer = RotatingPcapWriter(args.output_dir, max_bytes=int(args.rotate_mb * 1e6), max_seconds=args.rotate_seconds)
+
+    # Start the periodic print function in a separate thread
+    threading.Thread(target=print_packets_periodically, daemon=True).start()
+
+    # Start sniffing packets
+    try:
+        print("Sniffing packets... (Press Ctrl+C to stop)")
+        if args.backend == "tpacket":
+            capture = TPacketV3Capture(args.iface, args.bpf, args.snaplen, args.block_size, args.block_count)
+            try:
+                for frame in capture.frames():
+                    packet_handler(frame)
+            finally:
+                capture.close()
+        else:
+            sniff(iface=args.iface, prn=packet_handler, store=False)
+    except KeyboardInterrupt:
+        print("\nCapture stopped manually by user.")
+
+    # After capture ends, calculate PPS and Mbps
+    pps, mbps = calculate_speed()
+    print(f"\nCapture session finished.")
+    print(f"Total packets captured: {total_packets}")
+    print(f"Total PPS (Packets Per Second): {pps:.2f} pps")
+    print(f"Total Mbps (Megabits Per Second): {mbps:.2f} Mbps")
+
+    # Save captured packets to a pcap file
+    save_to_pcap()
+
+if __name__ == "__main__":
+    main()
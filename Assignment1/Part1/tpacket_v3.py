@@ -0,0 +1,139 @@
+import ctypes
+import mmap
+import select
+import socket
+import struct
+import subprocess
+
+from scapy.all import Ether
+
+# Linux constants (see <linux/if_packet.h> and <asm-generic/socket.h>)
+LINKTYPE_ETHERNET = 1
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+SO_ATTACH_FILTER = 26
+ETH_P_ALL = 0x0003
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+BPF_RET_K = 0x06
+
+# struct tpacket_req3 { block_size, block_nr, frame_size, frame_nr, retire_blk_tov, sizeof_priv, feature_req_word }
+TPACKET_REQ3 = struct.Struct("=7I")
+# struct tpacket_hdr_v1 inside struct tpacket_block_desc (after version/offset_to_priv)
+BLOCK_STATUS_OFFSET = 8
+BLOCK_HEADER = struct.Struct("=III")  # block_status, num_pkts, offset_to_first_pkt
+# struct tpacket3_hdr: tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len, tp_status, tp_mac, tp_net
+FRAME_HEADER = struct.Struct("=IIIIIIHH")
+
+
+class sock_filter(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_uint16), ("jt", ctypes.c_uint8), ("jf", ctypes.c_uint8), ("k", ctypes.c_uint32)]
+
+
+class sock_fprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.POINTER(sock_filter))]
+
+
+class Frame:
+    """A captured frame whose scapy dissection only happens on first access to .packet."""
+
+    __slots__ = ("time", "wirelen", "data", "_packet")
+
+    def __init__(self, timestamp, wirelen, data):
+        self.time = timestamp
+        self.wirelen = wirelen
+        self.data = data
+        self._packet = None
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def packet(self):
+        if self._packet is None:
+            self._packet = Ether(self.data)
+            self._packet.time = self.time
+            self._packet.wirelen = self.wirelen
+        return self._packet
+
+
+def compile_bpf(iface, expression, snaplen):
+    """Compile a tcpdump filter expression into classic BPF instructions.
+
+    The accept instructions return `snaplen`, so the kernel truncates frames
+    before they are copied into the ring.
+    """
+    if not expression:
+        return [(BPF_RET_K, 0, 0, snaplen)]
+    output = subprocess.check_output(["tcpdump", "-i", iface, "-s", str(snaplen), "-ddd", expression],
+                                     universal_newlines=True, stderr=subprocess.DEVNULL)
+    lines = output.strip().splitlines()
+    return [tuple(int(field) for field in line.split()) for line in lines[1:1 + int(lines[0])]]
+
+
+def attach_filter(sock, instructions):
+    program = (sock_filter * len(instructions))(*[sock_filter(*insn) for insn in instructions])
+    fprog = sock_fprog(len(instructions), ctypes.cast(program, ctypes.POINTER(sock_filter)))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, bytes(fprog))
+
+
+class TPacketV3Capture:
+    """Block-based AF_PACKET capture from a PACKET_MMAP TPACKET_V3 ring.
+
+    The kernel fills whole blocks of frames in a shared memory ring and hands a
+    block over once it is full or `block_timeout_ms` has passed, so a single
+    poll() delivers many frames instead of one recv() per frame. Frames are
+    yielded as raw bytes wrapped in Frame objects; scapy dissection is
+    deferred until Frame.packet is used.
+    """
+
+    def __init__(self, iface, bpf_filter=None, snaplen=262144, block_size=1 << 22, block_count=64, block_timeout_ms=100):
+        # Protocol 0 keeps the socket from receiving anything until it is bound below
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            # Attach the filter before binding so no unfiltered frames reach the ring
+            attach_filter(self.sock, compile_bpf(iface, bpf_filter, snaplen))
+            self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            frame_size = 2048  # Only used by the kernel for sanity checks in V3
+            request = TPACKET_REQ3.pack(block_size, block_count, frame_size,
+                                        block_size * block_count // frame_size, block_timeout_ms, 0, 0)
+            self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, request)
+            self.ring = mmap.mmap(self.sock.fileno(), block_size * block_count,
+                                  mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            self.sock.bind((iface, ETH_P_ALL))
+        except OSError:
+            self.sock.close()
+            raise
+        self.block_size = block_size
+        self.block_count = block_count
+        self.poller = select.poll()
+        self.poller.register(self.sock.fileno(), select.POLLIN | select.POLLERR)
+
+    def _wait_for_block(self, block_offset, timeout_ms):
+        while not BLOCK_HEADER.unpack_from(self.ring, block_offset + BLOCK_STATUS_OFFSET)[0] & TP_STATUS_USER:
+            if not self.poller.poll(timeout_ms):
+                return False
+        return True
+
+    def frames(self, timeout_ms=1000):
+        """Yield every captured Frame, blocking until traffic arrives."""
+        ring, block_index = self.ring, 0
+        while True:
+            block_offset = block_index * self.block_size
+            if not self._wait_for_block(block_offset, timeout_ms):
+                continue
+            _, num_pkts, frame_offset = BLOCK_HEADER.unpack_from(ring, block_offset + BLOCK_STATUS_OFFSET)
+            frame_offset += block_offset
+            for _ in range(num_pkts):
+                next_offset, sec, nsec, snaplen, wirelen, _, mac, _ = FRAME_HEADER.unpack_from(ring, frame_offset)
+                yield Frame(sec + nsec * 1e-9, wirelen, ring[frame_offset + mac:frame_offset + mac + snaplen])
+                frame_offset += next_offset
+            # Hand the block back to the kernel
+            struct.pack_into("=I", ring, block_offset + BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+            block_index = (block_index + 1) % self.block_count
+
+    def close(self):
+        self.ring.close()
+        self.sock.close()
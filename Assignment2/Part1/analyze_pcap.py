@@ -1,8 +1,825 @@
+import math
 import os
-import pyshark
+import resource
+import signal
+import socket
+import struct
+import numpy as np
 import pandas as pd
 import argparse
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from scapy.all import rdpcap, TCP, IP
+from results_store import ResultsStore
+
+# Capture file formats
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_INTERFACE_DESCRIPTION = 1
+PCAPNG_ENHANCED_PACKET = 6
+PCAPNG_OPTION_TSRESOL = 9
+
+# Link-layer types
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101)
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+IPPROTO_TCP = 6
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT = 44
+
+# TCP flag values
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+TcpSegment = namedtuple("TcpSegment", "ts wirelen ipv4 src dst sport dport seq ack flags window payload_len")
+
+# Sidecar timestamp index (<capture>.tsidx)
+INDEX_SUFFIX = ".tsidx"
+INDEX_MAGIC = b"PCAPTSI1"
+INDEX_HEADER = struct.Struct("<8sQqQd")  # magic, capture size, capture mtime_ns, entries, first timestamp
+INDEX_ENTRY = struct.Struct("<Qdd")  # record offset, latest timestamp before it, earliest timestamp from it on
+INDEX_STRIDE = 256  # Records per index entry
+
+TIME_SERIES_CHUNK = 1 << 16  # Segments binned per numpy batch
+TIME_SERIES_COLUMNS = ["flow", "time", "packets", "bytes", "throughput", "goodput"]
+
+SEQ_MASK = 0xFFFFFFFF
+TCP_FIN = 0x01
+REORDER_WINDOW = 0.003  # A hole filled within this many seconds was reordering, not loss, until the handshake RTT is known
+FLOW_IDLE_TIMEOUT = 60.0  # Seconds without packets before a flow's state is dropped
+MAX_HOLES = 1024  # Per flow; the oldest hole beyond this is counted as lost
+MAX_OUTSTANDING = 4096  # Unacknowledged segments remembered per flow for RTT matching
+RTT_BUCKET_GROWTH = 1.02  # Log-histogram bucket width: percentiles are within about 1%
+RTT_COLUMNS = ["flow", "samples", "handshake_rtt_ms", "min_rtt_ms", "mean_rtt_ms", "p50_rtt_ms", "p90_rtt_ms", "p99_rtt_ms", "max_rtt_ms"]
+RTT_SERIES_COLUMNS = ["flow", "time", "samples", "mean_rtt_ms", "min_rtt_ms", "max_rtt_ms"]
+RETRANSMISSION_COLUMNS = ["flow", "data_packets", "data_bytes", "retransmissions", "retransmitted_bytes", "out_of_order",
+                          "dup_acks", "lost_segments", "retransmission_rate", "loss_rate"]
+
+# Results store tables: name -> (CSV view, columns)
+RESULT_TABLES = {
+    "analysis": ("pcap_analysis", ["throughput", "goodput", "max_window", "loss_rate"]),
+    "timeseries": ("pcap_timeseries", ["interval"] + TIME_SERIES_COLUMNS),
+    "retransmissions": ("pcap_retransmissions", RETRANSMISSION_COLUMNS),
+    "rtt": ("pcap_rtt", RTT_COLUMNS),
+    "rtt_series": ("pcap_rtt_series", ["rtt_interval"] + RTT_SERIES_COLUMNS),
+}
+
+
+def iter_pcap(file, header, seek=None):
+    endian, ts_scale = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+    record_header = struct.Struct(endian + "IIII")
+    if seek is not None:
+        file.seek(seek)
+    while True:
+        offset = file.tell()
+        record = file.read(16)
+        if len(record) < 16:
+            return
+        ts_sec, ts_frac, incl_len, orig_len = record_header.unpack(record)
+        data = file.read(incl_len)
+        if len(data) < incl_len:
+            return
+        yield offset, linktype, ts_sec + ts_frac * ts_scale, orig_len, data
+
+
+def iter_pcapng(file, header, seek=None):
+    interfaces = []  # (link type, timestamp scale) per interface of the current section
+    endian = "<"
+    block = header
+    offset = 0
+    # Packet offsets are only safe to seek to while every interface is declared before the first packet
+    seekable, seen_packet = True, False
+    while True:
+        if len(block) < 8:
+            return
+        block_type = struct.unpack(endian + "I", block[:4])[0]
+        if block_type == PCAPNG_ENHANCED_PACKET and seek is not None:
+            # Interfaces are known now, jump to the requested packet block
+            offset = seek
+            file.seek(seek)
+            seek = None
+            block = file.read(8)
+            continue
+        body = b""
+        if block_type == PCAPNG_SECTION_HEADER:
+            # Each section declares its own byte order in the byte-order magic
+            body = file.read(4)
+            endian = "<" if body == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+            seekable = seekable and not seen_packet
+        block_len = struct.unpack(endian + "I", block[4:8])[0]
+        remaining = block_len - 8 - len(body)
+        body += file.read(remaining)
+        if remaining < 0 or len(body) < block_len - 8:
+            return
+        if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+            linktype = struct.unpack(endian + "H", body[:2])[0]
+            ts_scale, position = 1e-6, 8
+            while position + 4 <= len(body) - 4:
+                code, length = struct.unpack(endian + "HH", body[position:position + 4])
+                if code == 0:
+                    break
+                if code == PCAPNG_OPTION_TSRESOL:
+                    value = body[position + 4]
+                    ts_scale = 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+                position += 4 + (length + 3) // 4 * 4
+            interfaces.append((linktype, ts_scale))
+            seekable = seekable and not seen_packet
+        elif block_type == PCAPNG_ENHANCED_PACKET:
+            interface, ts_high, ts_low, caplen, orig_len = struct.unpack(endian + "IIIII", body[:20])
+            linktype, ts_scale = interfaces[interface]
+            seen_packet = True
+            yield (offset if seekable else None), linktype, ((ts_high << 32) | ts_low) * ts_scale, orig_len, body[20:20 + caplen]
+        offset += block_len
+        block = file.read(8)
+
+
+def iter_capture(pcap_file, seek=None, stop=None):
+    """Yield (record offset, link type, timestamp, wire length, captured bytes) for the packets of a pcap or pcapng file.
+
+    Reading starts at record offset `seek` and ends before record offset `stop`
+    (both as found in a TimeIndex). The offset is None for pcapng packets that
+    cannot be seeked to.
+    """
+    with open(pcap_file, "rb") as file:
+        header = file.read(24)
+        if header[:4] in PCAP_MAGIC:
+            records = iter_pcap(file, header, seek)
+        elif header[:4] == struct.pack("<I", PCAPNG_SECTION_HEADER):
+            file.seek(8)  # The section header block is re-read by iter_pcapng
+            records = iter_pcapng(file, header[:8], seek)
+        else:
+            raise ValueError(f"{pcap_file} is not a pcap or pcapng file")
+        for record in records:
+            if stop is not None and record[0] is not None and record[0] >= stop:
+                return
+            yield record
+
+
+def network_offset(linktype, data):
+    """Return (ethertype, offset of the network header) for a captured frame."""
+    if linktype == LINKTYPE_ETHERNET:
+        offset, ethertype = 14, (data[12] << 8) | data[13]
+        while ethertype in ETHERTYPE_VLAN and len(data) >= offset + 4:
+            ethertype = (data[offset + 2] << 8) | data[offset + 3]
+            offset += 4
+        return ethertype, offset
+    if linktype == LINKTYPE_LINUX_SLL:
+        return (data[14] << 8) | data[15], 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return (data[0] << 8) | data[1], 20
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        offset = 4
+    elif linktype in LINKTYPE_RAW or linktype in (LINKTYPE_IPV4, LINKTYPE_IPV6):
+        offset = 0
+    else:
+        return None, None
+    version = data[offset] >> 4 if len(data) > offset else 0
+    return {4: ETHERTYPE_IPV4, 6: ETHERTYPE_IPV6}.get(version), offset
+
+
+def decode_tcp(linktype, ts, wirelen, data):
+    """Decode the IPv4/IPv6 and TCP headers of a frame into a TcpSegment, or None if it is not TCP."""
+    try:
+        ethertype, offset = network_offset(linktype, data)
+        if ethertype == ETHERTYPE_IPV4:
+            header_len = (data[offset] & 0x0F) * 4
+            if data[offset + 9] != IPPROTO_TCP or ((data[offset + 6] << 8) | data[offset + 7]) & 0x1FFF:
+                return None
+            ip_payload_len = ((data[offset + 2] << 8) | data[offset + 3]) - header_len
+            src, dst = data[offset + 12:offset + 16], data[offset + 16:offset + 20]
+            tcp_offset = offset + header_len
+        elif ethertype == ETHERTYPE_IPV6:
+            next_header = data[offset + 6]
+            ip_payload_len = (data[offset + 4] << 8) | data[offset + 5]
+            src, dst = data[offset + 8:offset + 24], data[offset + 24:offset + 40]
+            tcp_offset = offset + 40
+            while next_header in IPV6_EXTENSION_HEADERS or next_header == IPV6_FRAGMENT:
+                extension_len = 8 if next_header == IPV6_FRAGMENT else (data[tcp_offset + 1] + 1) * 8
+                next_header = data[tcp_offset]
+                tcp_offset += extension_len
+                ip_payload_len -= extension_len
+            if next_header != IPPROTO_TCP:
+                return None
+        else:
+            return None
+        sport, dport, seq, ack, offset_flags, flags, window = struct.unpack_from("!HHIIBBH", data, tcp_offset)
+    except (IndexError, struct.error, TypeError):
+        return None  # Truncated headers
+    tcp_header_len = (offset_flags >> 4) * 4
+    return TcpSegment(ts, wirelen, ethertype == ETHERTYPE_IPV4, src, dst, sport, dport, seq, ack,
+                      ((offset_flags & 0x01) << 8) | flags, window, max(0, ip_payload_len - tcp_header_len))
+
+
+class TimeIndex:
+    """Sparse timestamp -> byte offset index of a capture, kept next to it as <capture>.tsidx.
+
+    Every INDEX_STRIDE-th record gets an entry with its offset, the latest
+    timestamp of any record before it and the earliest timestamp of any record
+    from it on, so captures with slightly out-of-order timestamps never lose
+    packets at the window edges.
+    """
+
+    def __init__(self, first_ts, offsets, max_before, min_from):
+        self.first_ts = first_ts
+        self.offsets = offsets
+        self.max_before = max_before
+        self.min_from = min_from
+
+    def byte_range(self, start_ts=None, end_ts=None):
+        """Return (seek, stop) record offsets enclosing every record with start_ts <= ts <= end_ts."""
+        seek = stop = None
+        if start_ts is not None and self.offsets:
+            # Last entry whose preceding records are all before the window
+            seek = self.offsets[max(0, bisect_left(self.max_before, start_ts) - 1)]
+        if end_ts is not None:
+            # First entry whose records are all after the window
+            entry = bisect_right(self.min_from, end_ts)
+            if entry < len(self.offsets):
+                stop = self.offsets[entry]
+        return seek, stop
+
+
+def build_time_index(pcap_file):
+    first_ts = None
+    offsets, max_before, chunk_min = [], [], []
+    latest, records_since_entry = float("-inf"), INDEX_STRIDE
+    for offset, _, ts, _, _ in iter_capture(pcap_file):
+        if first_ts is None:
+            first_ts = ts
+        if offset is not None and records_since_entry >= INDEX_STRIDE:
+            offsets.append(offset)
+            max_before.append(latest)
+            chunk_min.append(ts)
+            records_since_entry = 0
+        records_since_entry += 1
+        latest = max(latest, ts)
+        chunk_min[-1] = min(chunk_min[-1], ts)
+    min_from = chunk_min[:]
+    for entry in range(len(min_from) - 2, -1, -1):
+        min_from[entry] = min(min_from[entry], min_from[entry + 1])
+    return TimeIndex(first_ts if first_ts is not None else 0.0, offsets, max_before, min_from)
+
+
+def load_time_index(pcap_file):
+    """Return the capture's index, (re)building it when missing or stale."""
+    stat = os.stat(pcap_file)
+    index_file = pcap_file + INDEX_SUFFIX
+    try:
+        with open(index_file, "rb") as file:
+            magic, size, mtime_ns, entries, first_ts = INDEX_HEADER.unpack(file.read(INDEX_HEADER.size))
+            body = file.read()
+        if (magic, size, mtime_ns) == (INDEX_MAGIC, stat.st_size, stat.st_mtime_ns) and len(body) == entries * INDEX_ENTRY.size:
+            offsets, max_before, min_from = zip(*INDEX_ENTRY.iter_unpack(body)) if entries else ((), (), ())
+            return TimeIndex(first_ts, offsets, max_before, min_from)
+    except (OSError, struct.error):
+        pass  # Missing or unreadable index
+
+    index = build_time_index(pcap_file)
+    try:
+        temp_file = f"{index_file}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(index.offsets), index.first_ts))
+            file.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in zip(index.offsets, index.max_before, index.min_from)))
+        os.replace(temp_file, index_file)
+    except OSError:
+        pass  # Read-only capture directory: use the index for this run only
+    return index
+
+
+def iter_tcp_segments(pcap_file, start=None, end=None, index=None):
+    """Yield TcpSegments whose time relative to the first packet of the capture lies in [start, end].
+
+    With a TimeIndex only the records around the window are read.
+    """
+    first_ts, seek, stop = None, None, None
+    if index is not None:
+        first_ts = index.first_ts
+        seek, stop = index.byte_range(first_ts + start if start is not None else None,
+                                      first_ts + end if end is not None else None)
+    for _, linktype, ts, wirelen, data in iter_capture(pcap_file, seek, stop):
+        if first_ts is None:
+            first_ts = ts
+        relative = ts - first_ts
+        if start is not None and relative < start:
+            continue
+        if end is not None and relative > end:
+            continue
+        segment = decode_tcp(linktype, ts, wirelen, data)
+        if segment is not None:
+            yield segment
+
+
+class MetricsEngine:
+    """Throughput, goodput, max window and loss rate accumulated over a single pass.
+
+    Mirrors the pyshark/scapy functions below: throughput counts frame bytes,
+    goodput counts TCP payload bytes, both over the span between the first and
+    last TCP packet; the window is the raw (unscaled) header field; loss uses
+    the same SYN vs RST/ACK bookkeeping as calculate_packet_loss_rate.
+    """
+
+    def __init__(self):
+        self.first_ts = None
+        self.last_ts = None
+        self.total_bytes = 0
+        self.tcp_data_bytes = 0
+        self.max_window = 0
+        self.sent_packets = {}
+
+    def update(self, segment):
+        if self.first_ts is None:
+            self.first_ts = segment.ts
+        self.last_ts = segment.ts
+        self.total_bytes += segment.wirelen
+        self.tcp_data_bytes += segment.payload_len
+        if segment.window > self.max_window:
+            self.max_window = segment.window
+        if segment.ipv4:
+            key = (segment.src, segment.dst, segment.sport, segment.dport)
+            if segment.flags == TCP_SYN:
+                self.sent_packets[key] = self.sent_packets.get(key, 0) + 1
+            elif segment.flags in (TCP_RST, TCP_ACK) and key in self.sent_packets:
+                self.sent_packets[key] -= 1
+
+    def results(self):
+        duration = (self.last_ts - self.first_ts) if self.first_ts is not None else 0
+        lost_count = sum(v for v in self.sent_packets.values() if v > 0)
+        total_sent = sum(self.sent_packets.values())
+        return {
+            "throughput": (self.total_bytes * 8 / duration) if duration > 0 else 0,
+            "goodput": (self.tcp_data_bytes * 8 / duration) if duration > 0 else 0,
+            "max_window": self.max_window,
+            "loss_rate": (lost_count / total_sent) if total_sent > 0 else 0,
+        }
+
+
+def endpoint_to_str(address, port):
+    if len(address) == 4:
+        return f"{socket.inet_ntop(socket.AF_INET, address)}:{port}"
+    return f"[{socket.inet_ntop(socket.AF_INET6, address)}]:{port}"
+
+
+class TimeSeriesTracker:
+    """Throughput and goodput per `interval` seconds, per directional flow and for all traffic.
+
+    Segments are buffered and binned a chunk at a time with numpy (floor
+    division, np.unique and bincount), so the per-packet cost is a few list
+    appends. Bins are counted from `origin` (the first packet of the capture).
+    """
+
+    def __init__(self, interval, origin, chunk_size=TIME_SERIES_CHUNK):
+        self.interval = interval
+        self.origin = origin
+        self.chunk_size = chunk_size
+        self.flow_ids = {}
+        self.flow_names = []
+        self.ts, self.flows, self.wirelen, self.payload_len = [], [], [], []
+        self.totals = {}  # (flow id + 1, bin) -> [packets, bytes, payload bytes]; flow id + 1 == 0 is the aggregate
+
+    def update(self, segment):
+        key = (segment.src, segment.sport, segment.dst, segment.dport)
+        flow_id = self.flow_ids.get(key)
+        if flow_id is None:
+            flow_id = self.flow_ids[key] = len(self.flow_names)
+            self.flow_names.append(f"{endpoint_to_str(segment.src, segment.sport)}->{endpoint_to_str(segment.dst, segment.dport)}")
+        self.ts.append(segment.ts)
+        self.flows.append(flow_id + 1)
+        self.wirelen.append(segment.wirelen)
+        self.payload_len.append(segment.payload_len)
+        if len(self.ts) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.ts:
+            return
+        bins = np.floor((np.array(self.ts) - self.origin) / self.interval).astype(np.int64)
+        flows = np.array(self.flows, dtype=np.int64)
+        # Each segment counts once for its flow and once for the aggregate (flow 0)
+        bins = np.concatenate([bins, bins])
+        flows = np.concatenate([flows, np.zeros_like(flows)])
+        wirelen = np.tile(np.array(self.wirelen, dtype=np.int64), 2)
+        payload_len = np.tile(np.array(self.payload_len, dtype=np.int64), 2)
+
+        first_bin = bins.min()
+        span = int(bins.max() - first_bin) + 1
+        keys, inverse = np.unique(flows * span + (bins - first_bin), return_inverse=True)
+        packets = np.bincount(inverse)
+        byte_counts = np.bincount(inverse, weights=wirelen).astype(np.int64)
+        payload_counts = np.bincount(inverse, weights=payload_len).astype(np.int64)
+        totals = self.totals
+        for key, count, byte_count, payload_count in zip(keys.tolist(), packets.tolist(), byte_counts.tolist(), payload_counts.tolist()):
+            cell = (key // span, key % span + int(first_bin))
+            if cell in totals:
+                totals[cell][0] += count
+                totals[cell][1] += byte_count
+                totals[cell][2] += payload_count
+            else:
+                totals[cell] = [count, byte_count, payload_count]
+        self.ts, self.flows, self.wirelen, self.payload_len = [], [], [], []
+
+    def results(self):
+        """Return a DataFrame with one row per flow ("all" for the aggregate) and interval, gaps filled with zeros."""
+        self.flush()
+        if not self.totals:
+            return pd.DataFrame(columns=TIME_SERIES_COLUMNS)
+        cells = sorted(self.totals.items())
+        flows = np.array([flow for (flow, _), _ in cells], dtype=np.int64)
+        bins = np.array([bin_index for (_, bin_index), _ in cells], dtype=np.int64)
+        counts = np.array([counts for _, counts in cells], dtype=np.int64)
+
+        # Dense layout: each flow gets every bin from its first to its last
+        flow_ids, first_cell, cells_per_flow = np.unique(flows, return_index=True, return_counts=True)
+        first_bin = bins[first_cell]
+        lengths = bins[first_cell + cells_per_flow - 1] - first_bin + 1
+        flow_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        total = int(lengths.sum())
+        flow_index = np.repeat(np.arange(len(flow_ids)), lengths)
+        dense_bins = first_bin[flow_index] + np.arange(total) - flow_start[flow_index]
+        dense = np.zeros((total, 3), dtype=np.int64)
+        cell_flow = np.repeat(np.arange(len(flow_ids)), cells_per_flow)
+        dense[flow_start[cell_flow] + bins - first_bin[cell_flow]] = counts
+
+        names = np.array(["all"] + self.flow_names, dtype=object)
+        return pd.DataFrame({
+            "flow": names[flow_ids[flow_index]],
+            "time": np.round(dense_bins * self.interval, 9),
+            "packets": dense[:, 0],
+            "bytes": dense[:, 1],
+            "throughput": dense[:, 1] * 8 / self.interval,
+            "goodput": dense[:, 2] * 8 / self.interval,
+        })
+
+
+def unwrap_seq(seq, base, high):
+    """Map a 32-bit sequence number to the 64-bit offset from `base` closest to `high`."""
+    diff = (((seq - base) & SEQ_MASK) - (high & SEQ_MASK)) & SEQ_MASK
+    return high + (diff - (1 << 32) if diff >= 1 << 31 else diff)
+
+
+class FlowSequenceState:
+    """Sequence-space state of one direction of a TCP connection.
+
+    Sequence numbers are unwrapped to 64-bit offsets from the first one seen.
+    `holes` lists the [start, end) ranges below `high` that have not been seen
+    yet, with the time each one opened, so memory grows with the number of
+    gaps rather than the amount of data. A hole filled within `reorder_window`
+    of opening was reordered.
+    """
+
+    __slots__ = ("base", "high", "holes", "last_seen", "fin", "last_ack", "last_window", "syn_ts", "syn_acked",
+                 "reorder_window", "counts")
+
+    def __init__(self, seq, ts):
+        self.base = seq
+        self.high = 0
+        self.holes = []
+        self.last_seen = ts
+        self.fin = False
+        self.last_ack = None
+        self.last_window = None
+        self.syn_ts = None  # Time of the client's SYN until the handshake completes
+        self.syn_acked = False  # The server answered that SYN with a SYN-ACK
+        self.reorder_window = REORDER_WINDOW
+        # data packets, data bytes, retransmissions, retransmitted bytes, out of order, dup ACKs, lost segments
+        self.counts = [0, 0, 0, 0, 0, 0, 0]
+
+    def unwrap(self, seq):
+        return unwrap_seq(seq, self.base, self.high)
+
+    def fill_holes(self, start, end, ts):
+        """Remove [start, end) from the holes; return (bytes filled, whether a hole was filled within the reorder window)."""
+        filled, reordered, remaining = 0, False, []
+        for hole in self.holes:
+            hole_start, hole_end, opened = hole
+            if end <= hole_start or start >= hole_end:
+                remaining.append(hole)
+                continue
+            filled += min(end, hole_end) - max(start, hole_start)
+            reordered = reordered or ts - opened <= self.reorder_window
+            if hole_start < start:
+                remaining.append([hole_start, start, opened])
+            if end < hole_end:
+                remaining.append([end, hole_end, opened])
+        self.holes = remaining
+        return filled, reordered
+
+
+class RetransmissionTracker:
+    """Streaming retransmission, reordering, duplicate ACK and loss counts per directional flow.
+
+    A data segment above everything seen so far is new (a jump leaves a hole),
+    one that fills a hole within the reorder window is out of order, and any
+    other segment below the highest sequence seen is a retransmission. A
+    retransmission needs at least a round trip to arrive, so the reorder window
+    is the connection's handshake RTT (client SYN to the client's ACK of the
+    SYN-ACK) when the capture has the handshake, and REORDER_WINDOW otherwise,
+    as in Wireshark's TCP analysis. A pure ACK repeating the previous ACK
+    number and window while data is outstanding is a duplicate ACK. A flow's state is dropped on RST, once both sides have
+    sent FIN, or after FLOW_IDLE_TIMEOUT, leaving only its counters.
+    """
+
+    def __init__(self):
+        self.flows = {}
+        self.finished = {}  # flow key -> counters of flows whose state was dropped
+
+    def update(self, segment):
+        key = (segment.src, segment.sport, segment.dst, segment.dport)
+        reverse_key = (segment.dst, segment.dport, segment.src, segment.sport)
+        state = self.flows.get(key)
+        if state is None:
+            state = self.flows[key] = FlowSequenceState(segment.seq, segment.ts)
+        state.last_seen = segment.ts
+        flags = segment.flags
+        seq_len = segment.payload_len + (1 if flags & TCP_SYN else 0) + (1 if flags & TCP_FIN else 0)
+
+        if flags & TCP_SYN:
+            if not flags & TCP_ACK:
+                state.syn_ts, state.syn_acked = segment.ts, False  # The latest SYN, a retransmitted one is what got answered
+            elif reverse_key in self.flows and self.flows[reverse_key].syn_ts is not None:
+                self.flows[reverse_key].syn_acked = True
+        elif flags & TCP_ACK and state.syn_acked and reverse_key in self.flows:
+            # Handshake complete: its RTT is the reorder window of both directions
+            state.reorder_window = self.flows[reverse_key].reorder_window = segment.ts - state.syn_ts
+            state.syn_ts, state.syn_acked = None, False
+
+        if seq_len:
+            start = state.unwrap(segment.seq)
+            end = start + seq_len
+            counts = state.counts
+            if start >= state.high:
+                if start > state.high:
+                    state.holes.append([state.high, start, segment.ts])
+                    if len(state.holes) > MAX_HOLES:
+                        state.holes.pop(0)
+                        counts[6] += 1
+                state.high = end
+                retransmitted = reordered = False
+            else:
+                filled, reordered = state.fill_holes(start, end, segment.ts)
+                state.high = max(state.high, end)
+                retransmitted = not (filled and reordered)
+            if segment.payload_len:
+                counts[0] += 1
+                counts[1] += segment.payload_len
+                if retransmitted:
+                    counts[2] += 1
+                    counts[3] += segment.payload_len
+                elif reordered:
+                    counts[4] += 1
+        elif flags & TCP_ACK and not flags & TCP_RST:
+            sender = self.flows.get(reverse_key)
+            if (sender is not None and segment.ack == state.last_ack and segment.window == state.last_window
+                    and sender.unwrap(segment.ack) < sender.high):
+                sender.counts[5] += 1
+        if flags & TCP_ACK:
+            state.last_ack, state.last_window = segment.ack, segment.window
+
+        if flags & TCP_RST:
+            self.finish(key)
+            self.finish(reverse_key)
+        elif flags & TCP_FIN:
+            state.fin = True
+            if reverse_key in self.flows and self.flows[reverse_key].fin:
+                self.finish(key)
+                self.finish(reverse_key)
+
+    def finish(self, key):
+        state = self.flows.pop(key, None)
+        if state is None:
+            return
+        state.counts[6] += len(state.holes)  # Never filled: lost and not retransmitted within the capture
+        totals = self.finished.setdefault(key, [0] * len(state.counts))
+        for position, value in enumerate(state.counts):
+            totals[position] += value
+
+    def sweep(self, now):
+        """Drop the state of flows idle for more than FLOW_IDLE_TIMEOUT at `now`."""
+        for key in [key for key, state in self.flows.items() if now - state.last_seen > FLOW_IDLE_TIMEOUT]:
+            self.finish(key)
+
+    def results(self):
+        """Return a DataFrame with one row per directional flow that carried data or saw duplicate ACKs."""
+        for key in list(self.flows):
+            self.finish(key)
+        rows = []
+        for (src, sport, dst, dport), counts in self.finished.items():
+            data_packets, _, retransmissions, _, _, dup_acks, lost = counts
+            if not data_packets and not dup_acks:
+                continue
+            # Unfilled gaps are transmissions the capture never saw
+            rows.append([f"{endpoint_to_str(src, sport)}->{endpoint_to_str(dst, dport)}", *counts,
+                         retransmissions / data_packets if data_packets else 0,
+                         (retransmissions + lost) / (data_packets + lost) if data_packets + lost else 0])
+        return pd.DataFrame(rows, columns=RETRANSMISSION_COLUMNS)
+
+
+class RttFlowState:
+    """Unacknowledged segments of one flow direction as [end offset, send time, retransmitted, is SYN]."""
+
+    __slots__ = ("base", "high", "outstanding", "last_seen", "fin")
+
+    def __init__(self, seq, ts):
+        self.base = seq
+        self.high = 0
+        self.outstanding = deque(maxlen=MAX_OUTSTANDING)  # The oldest segments are forgotten first
+        self.last_seen = ts
+        self.fin = False
+
+
+class RttSummary:
+    """RTT samples of one flow: a log-bucket histogram plus exact count, sum, min and max."""
+
+    __slots__ = ("buckets", "count", "total", "minimum", "maximum", "handshake")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+        self.handshake = None
+
+    def add(self, rtt):
+        bucket = math.floor(math.log(max(rtt, 1e-6) * 1e6, RTT_BUCKET_GROWTH))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += rtt
+        self.minimum = min(self.minimum, rtt)
+        self.maximum = max(self.maximum, rtt)
+
+    def percentile(self, fraction):
+        rank, seen = fraction * self.count, 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                value = RTT_BUCKET_GROWTH ** (bucket + 0.5) / 1e6  # Bucket midpoint
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+
+class RttTracker:
+    """Streaming RTT samples per directional flow, from data (and SYN) segments to the ACKs covering them.
+
+    Only unacknowledged segments are kept, at most MAX_OUTSTANDING per flow.
+    Each ACK yields one sample for the newest segment it fully acknowledges,
+    unless that segment was retransmitted (Karn's rule), so a SYN answered by a
+    SYN-ACK gives the handshake RTT. Samples feed a per-flow log histogram for
+    percentiles and a per-`interval` series counted from `origin`.
+    """
+
+    def __init__(self, interval, origin):
+        self.interval = interval
+        self.origin = origin
+        self.flows = {}
+        self.summaries = {}
+        self.series = {}  # (flow key, bin) -> [samples, sum, min, max]
+
+    def update(self, segment):
+        key = (segment.src, segment.sport, segment.dst, segment.dport)
+        reverse_key = (segment.dst, segment.dport, segment.src, segment.sport)
+        state = self.flows.get(key)
+        if state is None:
+            state = self.flows[key] = RttFlowState(segment.seq, segment.ts)
+        state.last_seen = segment.ts
+        flags = segment.flags
+        seq_len = segment.payload_len + (1 if flags & TCP_SYN else 0) + (1 if flags & TCP_FIN else 0)
+
+        if seq_len:
+            start = unwrap_seq(segment.seq, state.base, state.high)
+            end = start + seq_len
+            retransmitted = start < state.high
+            if retransmitted:
+                # Karn's rule: an ACK for anything resent cannot be attributed to either transmission
+                for entry in state.outstanding:
+                    if entry[0] > start:
+                        entry[2] = True
+            if end > state.high:
+                state.outstanding.append([end, segment.ts, retransmitted, bool(flags & TCP_SYN)])
+                state.high = end
+
+        sender = self.flows.get(reverse_key)
+        if flags & TCP_ACK and sender is not None and sender.outstanding:
+            ack = unwrap_seq(segment.ack, sender.base, sender.high)
+            covered = None
+            while sender.outstanding and sender.outstanding[0][0] <= ack:
+                covered = sender.outstanding.popleft()
+            if covered is not None and not covered[2]:
+                self.add_sample(reverse_key, segment.ts - covered[1], covered[3], segment.ts)
+
+        if flags & TCP_RST:
+            self.finish(key)
+            self.finish(reverse_key)
+        elif flags & TCP_FIN:
+            state.fin = True
+        if sender is not None and state.fin and sender.fin and not state.outstanding and not sender.outstanding:
+            self.finish(key)
+            self.finish(reverse_key)
+
+    def sweep(self, now):
+        """Drop the state of flows idle for more than FLOW_IDLE_TIMEOUT at `now`."""
+        for key in [key for key, flow in self.flows.items() if now - flow.last_seen > FLOW_IDLE_TIMEOUT]:
+            self.finish(key)
+
+    def add_sample(self, key, rtt, handshake, ts):
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = self.summaries[key] = RttSummary()
+        summary.add(rtt)
+        if handshake and summary.handshake is None:
+            summary.handshake = rtt
+        cell_key = (key, math.floor((ts - self.origin) / self.interval))
+        cell = self.series.get(cell_key)
+        if cell is None:
+            self.series[cell_key] = [1, rtt, rtt, rtt]
+        else:
+            cell[0] += 1
+            cell[1] += rtt
+            cell[2] = min(cell[2], rtt)
+            cell[3] = max(cell[3], rtt)
+
+    def finish(self, key):
+        self.flows.pop(key, None)  # Only the summary and series outlive the flow
+
+    @staticmethod
+    def flow_name(key):
+        src, sport, dst, dport = key
+        return f"{endpoint_to_str(src, sport)}->{endpoint_to_str(dst, dport)}"
+
+    def results(self):
+        """Return per-flow RTT statistics in milliseconds."""
+        rows = []
+        for key, summary in self.summaries.items():
+            rows.append([self.flow_name(key), summary.count,
+                         summary.handshake * 1e3 if summary.handshake is not None else None,
+                         summary.minimum * 1e3, summary.total / summary.count * 1e3,
+                         summary.percentile(0.5) * 1e3, summary.percentile(0.9) * 1e3, summary.percentile(0.99) * 1e3,
+                         summary.maximum * 1e3])
+        return pd.DataFrame(rows, columns=RTT_COLUMNS)
+
+    def series_results(self):
+        """Return samples, mean, min and max RTT (ms) per flow and interval that had samples."""
+        rows = sorted([self.flow_name(key), round(bin_index * self.interval, 9), count, total / count * 1e3, low * 1e3, high * 1e3]
+                      for (key, bin_index), (count, total, low, high) in self.series.items())
+        return pd.DataFrame(rows, columns=RTT_SERIES_COLUMNS)
+
+
+def analyze_file(pcap_path, start=None, end=None, use_index=True, interval=None, retransmissions=False, rtt_interval=None):
+    """Compute every metric in one streaming pass over the raw capture file (or just the window's part of it).
+
+    With `interval`, the per-interval time series is collected in the same pass and returned under "series";
+    with `retransmissions`, per-flow retransmission and loss counts are returned under "retransmissions";
+    with `rtt_interval`, per-flow RTT statistics and their series are returned under "rtt" and "rtt_series".
+    """
+    engine = MetricsEngine()
+    trackers = {"metrics": engine}
+    index = load_time_index(pcap_path) if use_index and (start is not None or end is not None) else None
+    if interval or rtt_interval:
+        origin = index.first_ts if index is not None else capture_start_time(pcap_path) or 0.0
+    if interval:
+        trackers["series"] = TimeSeriesTracker(interval, origin)
+    if retransmissions:
+        trackers["retransmissions"] = RetransmissionTracker()
+    if rtt_interval:
+        trackers["rtt"] = RttTracker(rtt_interval, origin)
+    updates = [tracker.update for tracker in trackers.values()]
+    sweeps = [tracker.sweep for tracker in trackers.values() if hasattr(tracker, "sweep")]
+    last_sweep = None
+    for segment in iter_tcp_segments(pcap_path, start, end, index):
+        for update in updates:
+            update(segment)
+        # Flow-keyed trackers drop idle flows here, at most once per FLOW_IDLE_TIMEOUT of capture time
+        if sweeps and (last_sweep is None or segment.ts - last_sweep >= FLOW_IDLE_TIMEOUT):
+            last_sweep = segment.ts
+            for sweep in sweeps:
+                sweep(segment.ts)
+    metrics = engine.results()
+    for name, tracker in trackers.items():
+        if tracker is not engine:
+            metrics[name] = tracker.results()
+    if rtt_interval:
+        metrics["rtt_series"] = trackers["rtt"].series_results()
+    return metrics
+
 
 def filter_pcap_by_time(pcap, start_time, end_time):
     return [pkt for pkt in pcap if start_time <= float(pkt.sniff_time.timestamp()) <= end_time]
@@ -43,51 +860,210 @@ def calculate_packet_loss_rate(pcap_file):
     total_sent = sum(sent_packets.values())
     return (lost_count / total_sent) if total_sent > 0 else 0
 
+def capture_start_time(pcap_path):
+    """Timestamp of the first packet of the capture (None if it is empty)."""
+    for _, _, ts, _, _ in iter_capture(pcap_path):
+        return ts
+    return None
+
+def analyze_file_pyshark(pcap_path, start=None, end=None):
+    """Legacy path: pyshark (tshark) for throughput/goodput/window plus a second rdpcap pass for loss.
+
+    `start`/`end` are relative to the first packet of the capture, as in analyze_file.
+    """
+    import pyshark  # Only needed for --engine pyshark
+    cap = pyshark.FileCapture(pcap_path, display_filter="tcp")
+    try:
+        packets = cap
+        origin = capture_start_time(pcap_path) if start is not None or end is not None else None
+        if origin is not None:
+            packets = filter_pcap_by_time(cap, origin + start if start is not None else -math.inf,
+                                          origin + end if end is not None else math.inf)
+        return {
+            "throughput": calculate_throughput(packets),
+            "goodput": calculate_goodput(packets),
+            "max_window": calculate_max_window(packets),
+            "loss_rate": calculate_packet_loss_rate(pcap_path),
+        }
+    finally:
+        cap.close()
+
+def limit_worker_memory(memory_mb):
+    """Process pool initializer: cap each worker's address space so one huge capture cannot exhaust the machine."""
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def raise_timeout(signum, frame):
+    raise TimeoutError("analysis timed out")
+
+def analyze_with_timeout(analyze, pcap_path, start, end, timeout):
+    """Run one file's analysis, aborting it with TimeoutError after `timeout` seconds."""
+    if timeout:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return analyze(pcap_path, start, end)
+    finally:
+        if timeout:
+            signal.alarm(0)
+
+def run_pool(tasks, analyze, start, end, workers, timeout, memory_mb, results, progress):
+    """Analyze `tasks` on a fresh process pool; returns the tasks lost because a worker process died."""
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_worker_memory, initargs=(memory_mb,)) as executor:
+        futures = {executor.submit(analyze_with_timeout, analyze, pcap_path, start, end, timeout): (file, file_name, pcap_path)
+                   for file, file_name, pcap_path in tasks}
+        for future in as_completed(futures):
+            file, file_name, _ = futures[future]
+            try:
+                results[file_name] = future.result()
+                progress[0] += 1
+                print(f"[{progress[0]}/{progress[1]}] Processed {file}")
+            except BrokenProcessPool:
+                broken.append(futures[future])
+            except MemoryError:
+                progress[0] += 1
+                print(f"[{progress[0]}/{progress[1]}] Error processing {file}: exceeded the {memory_mb} MB memory cap")
+            except Exception as e:
+                progress[0] += 1
+                print(f"[{progress[0]}/{progress[1]}] Error processing {file}: {e}")
+    return broken
+
+def analyze_batch(tasks, analyze, start, end, workers, timeout=None, memory_mb=None):
+    """Analyze (file, file_name, pcap_path) tasks and return {file_name: metrics} for the ones that succeeded.
+
+    With more than one worker the files are spread over a process pool and
+    collected as they finish; a failing, timed-out or out-of-memory file only
+    loses its own row. If a worker process dies (e.g. killed under the memory
+    cap, or a crash in a native library), every file still in the pool is lost
+    with it, so those files are resubmitted to a fresh pool; once a pool breaks
+    without finishing anything, the remaining files run one per pool, so only
+    the file that kills its own worker is reported as failed.
+    """
+    results = {}
+    if workers <= 1:
+        for file, file_name, pcap_path in tasks:
+            print(f"Processing {file}...")
+            try:
+                results[file_name] = analyze_with_timeout(analyze, pcap_path, start, end, timeout)
+            except Exception as e:
+                print(f"Error processing {file}: {e}")
+        return results
+
+    print(f"Processing {len(tasks)} files on {workers} workers...")
+    progress = [0, len(tasks)]  # Files finished, total
+    pending, broken = tasks, []
+    while pending:
+        finished = progress[0]
+        broken = run_pool(pending, analyze, start, end, workers, timeout, memory_mb, results, progress)
+        if broken and progress[0] == finished:
+            break  # Nothing finished before the pool broke, isolate the files below
+        if broken:
+            print(f"A worker process died, resubmitting {len(broken)} files to a new pool...")
+        pending = broken
+
+    for task in broken:
+        file = task[0]
+        if run_pool([task], analyze, start, end, 1, timeout, memory_mb, results, progress):
+            progress[0] += 1
+            print(f"[{progress[0]}/{progress[1]}] Error processing {file}: the worker process died "
+                  f"(killed, e.g. out of memory{f' under the {memory_mb} MB cap' if memory_mb else ''}, or crashed)")
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze PCAP files and extract throughput, goodput, and more.")
     parser.add_argument('--start', type=int, default=None, help="Start time (seconds) for filtering packets")
     parser.add_argument('--end', type=int, default=None, help="End time (seconds) for filtering packets")
+    parser.add_argument('--engine', choices=["stream", "pyshark"], default="stream",
+                        help="stream: single pass over the raw file (times relative to the first packet); pyshark: legacy two-pass analysis")
+    parser.add_argument('--interval', type=float, default=None,
+                        help="Also write per-flow and aggregate throughput/goodput per this many seconds to pcap_timeseries.csv")
+    parser.add_argument('--retransmissions', action='store_true',
+                        help="Also write per-flow retransmission, out-of-order, duplicate ACK and loss counts to pcap_retransmissions.csv")
+    parser.add_argument('--rtt', action='store_true',
+                        help="Also write per-flow RTT percentiles to pcap_rtt.csv and their time series to pcap_rtt_series.csv")
+    parser.add_argument('--rtt_interval', type=float, default=1.0, help="Bin width (seconds) of the RTT time series")
+    parser.add_argument('--no_index', action='store_true', help="Do not build or use the <capture>.tsidx timestamp index for --start/--end")
+    parser.add_argument('--workers', type=int, default=1, help="Analyze files in parallel on this many worker processes")
+    parser.add_argument('--timeout', type=int, default=None, help="Give up on a file after this many seconds")
+    parser.add_argument('--memory_mb', type=int, default=None, help="Address-space cap per worker process in MB (with --workers > 1)")
+    parser.add_argument('--db', default="pcap_results.db", help="SQLite results store the CSV files are exported from")
     args = parser.parse_args()
+    if (args.interval is not None or args.retransmissions or args.rtt) and args.engine != "stream":
+        parser.error("--interval, --retransmissions and --rtt require --engine stream")
 
     PCAP_FOLDER = "pcap_files"
-    output_file = "pcap_analysis.csv"
 
-    existing_df = pd.read_csv(output_file) if os.path.exists(output_file) else pd.DataFrame(columns=["file_name", "throughput", "goodput", "max_window", "loss_rate"])
-    processed_files = set(existing_df["file_name"]) if not existing_df.empty else set()
+    # Result table -> parameters its rows are keyed by (besides the capture's content hash)
+    params = {"engine": args.engine, "start": args.start, "end": args.end}
+    wanted = {"analysis": params}
+    if args.interval:
+        wanted["timeseries"] = dict(params, interval=args.interval)
+    if args.retransmissions:
+        wanted["retransmissions"] = params
+    if args.rtt:
+        wanted["rtt"] = params
+        wanted["rtt_series"] = dict(params, rtt_interval=args.rtt_interval)
+    store = ResultsStore(args.db, RESULT_TABLES)
+    for table, (view, _) in RESULT_TABLES.items():
+        store.import_csv(table, f"{view}.csv")
+
+    if args.engine == "stream":
+        analyze = partial(analyze_file, use_index=not args.no_index, interval=args.interval, retransmissions=args.retransmissions,
+                          rtt_interval=args.rtt_interval if args.rtt else None)
+    else:
+        analyze = analyze_file_pyshark
 
-    results = []
-    for file in os.listdir(PCAP_FOLDER):
+    tasks = []
+    content_hashes = {}
+    duplicates = {}  # file name -> file name of an identical capture analyzed in this run
+    first_with_hash = {}
+    for file in sorted(os.listdir(PCAP_FOLDER)):
         if (file.endswith(".pcap") or file.endswith('.pcapng')):
             pcap_path = os.path.join(PCAP_FOLDER, file)
-            print(f"Processing {file}...")
-            try:
-                cap = pyshark.FileCapture(pcap_path, display_filter="tcp")
-                if args.start is not None and args.end is not None:
-                    cap = filter_pcap_by_time(cap, args.start, args.end)
-                    file_name = f"{file}_{args.start}_{args.end}"
-                else:
-                    file_name = file
-                
-                if file_name in processed_files:
-                    print(f"Skipping {file_name}, already processed.")
-                    continue
-
-                throughput = calculate_throughput(cap)
-                goodput = calculate_goodput(cap)
-                max_window = calculate_max_window(cap)
-                loss_rate = calculate_packet_loss_rate(pcap_path)
-                results.append([file_name, throughput, goodput, max_window, loss_rate])
-                cap.close()
-            except Exception as e:
-                print(f"Error processing {file}: {e}")
+            if args.start is not None or args.end is not None:
+                # Open ends are left empty, e.g. capture.pcap_15_ for --start 15
+                file_name = f"{file}_{'' if args.start is None else args.start}_{'' if args.end is None else args.end}"
+            else:
+                file_name = file
 
-    if results:
-        new_df = pd.DataFrame(results, columns=["file_name", "throughput", "goodput", "max_window", "loss_rate"])
-        final_df = pd.concat([existing_df, new_df], ignore_index=True)
-        final_df.to_csv(output_file, index=False)
-        print(f"Updated results saved to {output_file}")
-    else:
+            content_hash = store.content_hash(pcap_path)
+            present = [store.has(table, content_hash, table_params, file_name) for table, table_params in wanted.items()]
+            if all(present):
+                print(f"Skipping {file_name}, already processed.")
+                continue
+            content_hashes[file_name] = content_hash
+            if content_hash in first_with_hash:
+                duplicates[file_name] = first_with_hash[content_hash]
+                continue
+            first_with_hash[content_hash] = file_name
+            tasks.append((file, file_name, pcap_path))
+
+    metrics_by_name = analyze_batch(tasks, analyze, args.start, args.end, args.workers, args.timeout, args.memory_mb)
+    for file_name, original in duplicates.items():
+        if original in metrics_by_name:
+            metrics_by_name[file_name] = metrics_by_name[original]
+    for file_name in content_hashes:  # Keep directory order regardless of completion order
+        if file_name in metrics_by_name:
+            metrics = metrics_by_name[file_name]
+            rows = {"analysis": pd.DataFrame([metrics], columns=RESULT_TABLES["analysis"][1]),
+                    "timeseries": metrics.get("series", pd.DataFrame()).assign(interval=args.interval),
+                    "retransmissions": metrics.get("retransmissions"),
+                    "rtt": metrics.get("rtt"),
+                    "rtt_series": metrics.get("rtt_series", pd.DataFrame()).assign(rtt_interval=args.rtt_interval)}
+            for table, table_params in wanted.items():
+                store.save(table, content_hashes[file_name], table_params, file_name, rows[table])
+
+    # The CSV files are views of the store, so they also pick up results written by concurrent runs
+    for table in wanted:
+        output_file = f"{RESULT_TABLES[table][0]}.csv"
+        store.export(table, output_file)
+        if metrics_by_name:
+            print(f"Updated results saved to {output_file}")
+    if not metrics_by_name:
         print("No new PCAP files to process.")
+    store.close()
 
 if __name__ == '__main__':
     main()
@@ -1,83 +1,398 @@
 import argparse
+import itertools
+import queue
+import threading
+import time
+from array import array
+from collections import deque
+import json
+import socket
+import struct
 import subprocess
 import sys
 import pickle
 import os
+import numpy as np
 import matplotlib.pyplot as plt
 from tqdm import tqdm
 
-def run_tshark(pcap_file):
-    print("[INFO] Running tshark to extract packet data...")
-    fields = [
-        "-e", "frame.time_epoch", "-e", "ip.src", "-e", "ip.dst",
-        "-e", "tcp.srcport", "-e", "tcp.dstport", "-e", "tcp.flags.syn",
-        "-e", "tcp.flags.ack", "-e", "tcp.flags.fin", "-e", "tcp.flags.reset"
-    ]
-    cmd = ["tshark", "-r", pcap_file, "-Y", "tcp", "-T", "fields"] + fields
+# Typed caches: one row per packet to or from the server, and one row per connection
+PACKET_DTYPE = np.dtype([("time", "f8"), ("src", "u4"), ("dst", "u4"), ("sport", "u2"), ("dport", "u2"), ("flags", "u1")])
+# end is NaN if the connection never closed, handshake (SYN to the client's ACK) is NaN if it never completed
+CONNECTION_DTYPE = np.dtype([("client", "u4"), ("port", "u2"), ("start", "f8"), ("end", "f8"), ("handshake", "f8")])
+SYN, ACK, FIN, RST = 1, 2, 4, 8
+# Connection table states
+HALF_OPEN, SYN_RECEIVED, ESTABLISHED = 0, 1, 2
+CHUNK_SIZE = 1 << 16
+PACKETS_CACHE, CONNECTIONS_CACHE = "packets.npy", "connections.npy"
+
+TSHARK_FIELDS = [
+    "-e", "frame.time_epoch", "-e", "ip.src", "-e", "ip.dst",
+    "-e", "tcp.srcport", "-e", "tcp.dstport", "-e", "tcp.flags.syn",
+    "-e", "tcp.flags.ack", "-e", "tcp.flags.fin", "-e", "tcp.flags.reset"
+]
+# Live monitor
+LIVE_HALF_OPEN_TIMEOUT = 30.0
+LIVE_EVENTS = ("syn", "synack", "established", "closed", "reset")
+
+def tshark_command(pcap_file):
+    return ["tshark", "-r", pcap_file, "-Y", "tcp", "-T", "fields"] + TSHARK_FIELDS
+
+def stream_tshark(pcap_file):
+    """Yield tshark's output lines as they are produced, without holding the whole output in memory."""
+    print("[INFO] Streaming packet data from tshark...")
+    process = subprocess.Popen(tshark_command(pcap_file), stdout=subprocess.PIPE, universal_newlines=True)
+    count = 0
     try:
-        output = subprocess.check_output(cmd, universal_newlines=True).strip().splitlines()
-        print(f"[INFO] Extracted {len(output)} packets from the PCAP file.")
-        return output
-    except subprocess.CalledProcessError as e:
-        sys.exit(f"[ERROR] Error running tshark: {e}")
-
-def parse_packets(output):
-    print("[INFO] Parsing extracted packet data...")
-    packets = []
-    for line in tqdm(output, desc="Parsing packets"):
-        fields = line.split("\t")
+        for line in process.stdout:
+            count += 1
+            yield line
+    finally:
+        process.stdout.close()
+        if process.poll() is None:  # The consumer stopped early
+            process.terminate()
+        process.wait()
+    if process.returncode != 0:
+        sys.exit(f"[ERROR] Error running tshark: exit status {process.returncode}")
+    print(f"[INFO] Extracted {count} packets from the PCAP file.")
+
+def ip_to_int(address):
+    return struct.unpack("!I", socket.inet_aton(address))[0]
+
+def iter_packets(lines):
+    """Parse tshark lines into (time, src, dst, sport, dport, flags) tuples with integer addresses and a flag bitmask."""
+    for line in lines:
+        fields = line.rstrip("\n").split("\t")
         if len(fields) < 9:
             continue
         try:
-            packets.append({
-                "time": float(fields[0]), "src": fields[1], "dst": fields[2],
-                "sport": fields[3], "dport": fields[4], "syn": fields[5],
-                "ack": fields[6], "fin": fields[7], "rst": fields[8]
-            })
-        except (ValueError, IndexError):
-            continue
-    print(f"[INFO] Successfully parsed {len(packets)} valid packets.")
+            flags = sum(bit for bit, value in zip((SYN, ACK, FIN, RST), fields[5:9]) if value in ("1", "True"))
+            yield (float(fields[0]), ip_to_int(fields[1]), ip_to_int(fields[2]),
+                   int(fields[3]), int(fields[4]), flags)
+        except (ValueError, OSError):
+            continue  # Not IPv4 TCP (or tunneled, with several comma-separated values)
+
+def server_mask(packets, server, server_port):
+    return (((packets["dst"] == server) & (packets["dport"] == server_port))
+            | ((packets["src"] == server) & (packets["sport"] == server_port)))
+
+def build_packet_array(lines, server, server_port):
+    """Parse tshark lines into a PACKET_DTYPE array holding only the packets to or from the server."""
+    chunks = []
+    packets = iter_packets(lines)
+    while True:
+        chunk = np.fromiter(itertools.islice(packets, CHUNK_SIZE), dtype=PACKET_DTYPE)
+        chunks.append(chunk[server_mask(chunk, server, server_port)])
+        if len(chunk) < CHUNK_SIZE:
+            break
+    packets = np.concatenate(chunks)
+    print(f"[INFO] Successfully parsed {len(packets)} packets to or from the server.")
     return packets
 
-def analyze_packets(packets, server_ip, server_port):
-    print("[INFO] Analyzing TCP connections...")
-    connections = {}
-    for pkt in tqdm(packets, desc="Processing packets"):
-        is_to_server = pkt["dst"] == server_ip and str(pkt["dport"]) == str(server_port)
-        if is_to_server:
-            conn_tuple = (pkt["src"], pkt["dst"], pkt["sport"], pkt["dport"])
-            direction = "c2s"
-        elif pkt["src"] == server_ip and str(pkt["sport"]) == str(server_port):
-            conn_tuple = (pkt["dst"], pkt["src"], pkt["dport"], pkt["sport"])
-            direction = "s2c"
+def iter_packet_array(packets):
+    # tolist() per chunk is far faster than reading numpy rows one at a time
+    for i in range(0, len(packets), CHUNK_SIZE):
+        yield from packets[i:i + CHUNK_SIZE].tolist()
+
+class ConnectionTable:
+    """Open connections to the server in array-backed slots, keyed by client address << 16 | client port.
+
+    A connection starts at the client's SYN and ends at a RST, or at the first ACK
+    after a FIN-ACK. Finished connections are moved out of the table into compact
+    result columns. With `half_open_timeout`, connections whose handshake has not
+    completed that many seconds after the SYN (spoofed flood sources), and ones
+    reset before completing it, are only counted, so the table stays bounded by
+    the flood rate times the timeout however many sources the flood uses.
+    """
+
+    def __init__(self, server, server_port, half_open_timeout=None, keep_finished=True):
+        self.server = server
+        self.server_port = server_port
+        self.half_open_timeout = half_open_timeout
+        self.keep_finished = keep_finished
+        self.slots = {}  # key -> slot
+        self.half_open = 0  # Open connections that have not completed the handshake
+        self.free = []
+        self.start = array("d")
+        self.handshake_time = array("d")
+        self.state = array("B")
+        self.fin_ack_seen = array("B")
+        self.expiry = deque()  # (deadline, key, start) of half-open connections, in SYN order
+        self.finished = {field: array(code) for field, code in
+                         (("client", "I"), ("port", "H"), ("start", "d"), ("end", "d"), ("handshake", "d"))}
+        self.counters = dict.fromkeys(("syns", "handshakes", "closed", "reset", "evicted", "open"), 0)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def open(self, key, time):
+        if self.free:
+            slot = self.free.pop()
+            self.start[slot], self.handshake_time[slot] = time, np.nan
+            self.state[slot], self.fin_ack_seen[slot] = HALF_OPEN, 0
         else:
-            continue
-        
-        syn_flag, ack_flag = pkt["syn"] == "1", pkt["ack"] == "1"
-        fin_flag, rst_flag = pkt["fin"] == "1", pkt["rst"] == "1"
-        
-        if syn_flag and not ack_flag and direction == "c2s":
-            connections.setdefault(conn_tuple, {"start": pkt["time"], "end": None, "fin_ack_seen": False})
-        
-        if conn_tuple in connections and connections[conn_tuple]["end"] is None:
-            if rst_flag:
-                connections[conn_tuple]["end"] = pkt["time"]
-            elif fin_flag and ack_flag:
-                connections[conn_tuple]["fin_ack_seen"] = True
-            elif ack_flag and connections[conn_tuple]["fin_ack_seen"]:
-                connections[conn_tuple]["end"] = pkt["time"]
-    print(f"[INFO] Identified {len(connections)} unique TCP connections.")
+            slot = len(self.start)
+            self.start.append(time)
+            self.handshake_time.append(np.nan)
+            self.state.append(HALF_OPEN)
+            self.fin_ack_seen.append(0)
+        self.slots[key] = slot
+        self.half_open += 1
+        if self.half_open_timeout is not None:
+            self.expiry.append((time + self.half_open_timeout, key, time))
+
+    def close(self, key, end):
+        slot = self.slots.pop(key)
+        self.free.append(slot)
+        if self.state[slot] != ESTABLISHED:
+            self.half_open -= 1
+            if self.half_open_timeout is not None:
+                return False  # Flood residue, only counted
+        if not self.keep_finished:
+            return True
+        for field, value in (("client", key >> 16), ("port", key & 0xFFFF), ("start", self.start[slot]),
+                             ("end", end), ("handshake", self.handshake_time[slot])):
+            self.finished[field].append(value)
+        return True
+
+    def expire(self, now):
+        while self.expiry and self.expiry[0][0] <= now:
+            _, key, start = self.expiry.popleft()
+            slot = self.slots.get(key)
+            # Skip connections that completed the handshake, closed, or were replaced by a newer SYN
+            if slot is not None and self.state[slot] != ESTABLISHED and self.start[slot] == start:
+                self.close(key, np.nan)
+                self.counters["evicted"] += 1
+
+    def update(self, time, src, dst, sport, dport, flags):
+        """Apply one packet; returns (event, seconds) for "syn", "synack", "established" (handshake time),
+        "closed" or "reset" (connection duration), or None."""
+        if dst == self.server and dport == self.server_port:
+            key, to_server = src << 16 | sport, True
+        elif src == self.server and sport == self.server_port:
+            key, to_server = dst << 16 | dport, False
+        else:
+            return None
+        if self.expiry:
+            self.expire(time)
+
+        if flags & SYN and not flags & ACK and to_server and key not in self.slots:
+            self.open(key, time)
+            self.counters["syns"] += 1
+            return ("syn", None)
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+
+        if flags & RST:
+            duration = time - self.start[slot]
+            self.close(key, time)
+            self.counters["reset"] += 1
+            return ("reset", duration)
+        if flags & SYN and flags & ACK and not to_server and not self.fin_ack_seen[slot]:
+            if self.state[slot] == HALF_OPEN:
+                self.state[slot] = SYN_RECEIVED
+            return ("synack", None)
+        if flags & FIN and flags & ACK:
+            self.fin_ack_seen[slot] = 1
+        elif flags & ACK and self.fin_ack_seen[slot]:
+            duration = time - self.start[slot]
+            self.close(key, time)
+            self.counters["closed"] += 1
+            return ("closed", duration)
+        if flags & ACK and to_server and self.state[slot] != ESTABLISHED:  # The SYN-ACK may be missing from the capture
+            self.state[slot] = ESTABLISHED
+            self.half_open -= 1
+            self.handshake_time[slot] = time - self.start[slot]
+            self.counters["handshakes"] += 1
+            return ("established", self.handshake_time[slot])
+        return None
+
+    def finish(self):
+        """Move the connections still open at the end of the capture to the results (half-open ones are counted as evicted)."""
+        for key in list(self.slots):
+            if self.close(key, np.nan):
+                self.counters["open"] += 1
+            else:
+                self.counters["evicted"] += 1
+        self.expiry.clear()
+
+    def connections(self):
+        """Finished connections as a CONNECTION_DTYPE array in order of their SYN."""
+        result = np.empty(len(self.finished["start"]), dtype=CONNECTION_DTYPE)
+        for field, column in self.finished.items():
+            result[field] = np.frombuffer(column, dtype=CONNECTION_DTYPE[field]) if len(column) else []
+        return result[np.argsort(result["start"], kind="stable")]
+
+def analyze_packets(packets, server, server_port, total=None, half_open_timeout=None):
+    """Run `packets`, (time, src, dst, sport, dport, flags) tuples as produced by iter_packets, through a ConnectionTable."""
+    print("[INFO] Analyzing TCP connections...")
+    table = ConnectionTable(server, server_port, half_open_timeout)
+    for packet in tqdm(packets, desc="Processing packets", total=total):
+        table.update(*packet)
+    table.finish()
+    connections = table.connections()
+    counters = table.counters
+    print(f"[INFO] Identified {counters['syns']} TCP connections: {counters['handshakes']} completed the handshake, "
+          f"{counters['closed']} closed, {counters['reset']} reset, {counters['open']} still open, "
+          f"{counters['evicted']} half-open evicted.")
+    print(f"[INFO] Kept {len(connections)} connections for the duration analysis.")
     return connections
 
+class HealthMonitor:
+    """Per-second counts of ConnectionTable events over a sliding window, with threshold alerts."""
+
+    def __init__(self, table, window, syn_rate, half_open_ratio, latency_ms):
+        self.table = table
+        self.buckets = deque(maxlen=window)
+        self.thresholds = {"SYN rate": syn_rate, "half-open ratio": half_open_ratio, "handshake p95": latency_ms}
+        self.alerts = set()
+        self.second = None
+        self.evicted = 0
+
+    def new_bucket(self):
+        bucket = dict.fromkeys(LIVE_EVENTS, 0)
+        bucket["handshakes"], bucket["durations"] = [], []
+        return bucket
+
+    def advance(self, now):
+        """Report every second that ended before `now`."""
+        second = int(now)
+        self.table.expire(now)
+        if self.second is None:
+            self.second = second
+            self.buckets.append(self.new_bucket())
+        while self.second < second:
+            self.report()
+            self.second += 1
+            self.buckets.append(self.new_bucket())
+
+    def record(self, event):
+        name, seconds = event
+        bucket = self.buckets[-1]
+        bucket[name] += 1
+        if name == "established":
+            bucket["handshakes"].append(seconds)
+        elif name == "closed":
+            bucket["durations"].append(seconds)
+
+    def report(self):
+        span = len(self.buckets)
+        totals = {name: sum(bucket[name] for bucket in self.buckets) for name in LIVE_EVENTS}
+        handshakes = [value for bucket in self.buckets for value in bucket["handshakes"]]
+        durations = [value for bucket in self.buckets for value in bucket["durations"]]
+        syn_rate = totals["syn"] / span
+        # Share of the window's SYNs that did not complete the handshake
+        half_open_ratio = 1 - min(totals["established"] / totals["syn"], 1) if totals["syn"] else 0.0
+        p50, p95 = np.percentile(handshakes, [50, 95]) * 1000 if handshakes else (np.nan, np.nan)
+        evicted, self.evicted = self.table.counters["evicted"] - self.evicted, self.table.counters["evicted"]
+
+        print(f"[LIVE] {time.strftime('%H:%M:%S', time.localtime(self.second))} | "
+              f"SYN {syn_rate:.0f}/s, SYN-ACK {totals['synack'] / span:.0f}/s, handshakes {totals['established'] / span:.0f}/s | "
+              f"half-open {half_open_ratio:.1%} ({self.table.half_open} pending, {evicted} evicted) | "
+              f"handshake p50 {p50:.1f} ms, p95 {p95:.1f} ms | "
+              f"duration mean {np.mean(durations) if durations else np.nan:.2f} s ({len(durations)} closed)", flush=True)
+
+        # SYNs with no completed handshake in the whole window is the worst latency there is
+        latency = p95 if handshakes else (np.inf if totals["syn"] else np.nan)
+        values = {"SYN rate": syn_rate, "half-open ratio": half_open_ratio, "handshake p95": latency}
+        for name, threshold in self.thresholds.items():
+            if threshold is None or np.isnan(values[name]):
+                continue  # Nothing to measure, keep the alert as it is
+            if values[name] > threshold and name not in self.alerts:
+                self.alerts.add(name)
+                print(f"[ALERT] {name} {values[name]:.3g} above {threshold:g}", flush=True)
+            elif not values[name] > threshold and name in self.alerts:
+                self.alerts.discard(name)
+                print(f"[ALERT] {name} back to {values[name]:.3g}", flush=True)
+
+def start_live_capture(args):
+    """Start tshark on an interface (--live) or on a pcap that is still being written (--follow)."""
+    if args.live:
+        capture_filter = f"tcp port {args.server_port} and host {args.server_ip}"
+        tshark = subprocess.Popen(["tshark", "-l", "-i", args.live, "-f", capture_filter, "-T", "fields"] + TSHARK_FIELDS,
+                                  stdout=subprocess.PIPE, universal_newlines=True)
+        return [tshark]
+    # tail -F keeps reading as tcpdump appends, and waits for the file if it does not exist yet
+    tail = subprocess.Popen(["tail", "-c", "+1", "-F", args.follow], stdout=subprocess.PIPE)
+    tshark = subprocess.Popen(["tshark", "-l", "-r", "-", "-Y", "tcp", "-T", "fields"] + TSHARK_FIELDS,
+                              stdin=tail.stdout, stdout=subprocess.PIPE, universal_newlines=True)
+    tail.stdout.close()
+    return [tail, tshark]
+
+def read_lines(stream, lines):
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+def monitor_live(args, server):
+    processes = start_live_capture(args)
+    lines = queue.Queue()
+    # Read in a thread, so the report still comes every second when no packets arrive
+    threading.Thread(target=read_lines, args=(processes[-1].stdout, lines), daemon=True).start()
+
+    timeout = args.half_open_timeout if args.half_open_timeout is not None else LIVE_HALF_OPEN_TIMEOUT
+    table = ConnectionTable(server, args.server_port, timeout, keep_finished=False)
+    monitor = HealthMonitor(table, args.window, args.alert_syn_rate, args.alert_half_open, args.alert_latency)
+    print(f"[INFO] Monitoring {args.server_ip}:{args.server_port} on {args.live or args.follow} "
+          f"({args.window} s window, half-open timeout {timeout:g} s)...", flush=True)
+    # Packet timestamps drive the clock; while idle it advances with the wall clock
+    clock, clock_set_at = None, None
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=1.0)
+            except queue.Empty:
+                if clock is not None:
+                    monitor.advance(clock + time.time() - clock_set_at)
+                continue
+            if line is None:
+                break
+            for packet in iter_packets([line]):
+                clock, clock_set_at = packet[0], time.time()
+                monitor.advance(clock)
+                event = table.update(*packet)
+                if event is not None:
+                    monitor.record(event)
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopping monitor.")
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+            process.wait()
+    if monitor.second is not None:
+        monitor.report()
+
+def cache_key(pcap_file, server_ip, server_port):
+    stat = os.stat(pcap_file)
+    return {"pcap": os.path.abspath(pcap_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "server_ip": server_ip, "server_port": server_port}
+
+def load_cache(path, key):
+    """Memory-map a cached array if it was built from the same capture and server, else None."""
+    try:
+        with open(path + ".json") as file:
+            if json.load(file) != key:
+                return None
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+def save_cache(path, array, key):
+    temporary_path = path + ".tmp.npy"
+    np.save(temporary_path, array)
+    os.replace(temporary_path, path)  # Atomic, so readers never see a partial array
+    with open(path + ".json.tmp", "w") as file:
+        json.dump(key, file)
+    os.replace(path + ".json.tmp", path + ".json")
+
 def compute_durations(connections):
     print("[INFO] Computing connection durations...")
-    start_times, durations = [], []
-    min_start = min(info["start"] for info in connections.values())
-    for info in connections.values():
-        start_times.append(info["start"] - min_start)
-        durations.append(info["end"] - info["start"] if info["end"] else 100.0)
+    start_times = connections["start"] - connections["start"].min()
+    durations = np.where(np.isnan(connections["end"]), 100.0, connections["end"] - connections["start"])
     print("[INFO] Saving sorted connection durations to 'sorted_durations.pkl'")
-    pickle.dump(sorted(durations), open("sorted_durations.pkl", "wb"))
+    pickle.dump(sorted(durations.tolist()), open("sorted_durations.pkl", "wb"))
     return start_times, durations
 
 def plot_durations(start_times, durations, attack_start, attack_end):
@@ -105,35 +420,65 @@ def plot_durations(start_times, durations, attack_start, attack_end):
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("pcap_file", help="Path to PCAP file")
+    parser.add_argument("pcap_file", nargs="?", help="Path to PCAP file")
     parser.add_argument("--server_ip", default="192.168.56.104")
     parser.add_argument("--server_port", type=int, default=8000)
     parser.add_argument("--attack_start", type=float, default=20)
     parser.add_argument("--attack_end", type=float, default=120)
     parser.add_argument("--load_packets", action="store_true")
     parser.add_argument("--load_connections", action="store_true")
+    parser.add_argument("--half_open_timeout", type=float,
+                        help="Count connections whose handshake has not completed this many seconds after the SYN as "
+                             "flood residue and drop them, instead of keeping every SYN as a connection")
+    parser.add_argument("--stream", action="store_true",
+                        help="Feed tshark's output straight into the connection analysis instead of building and caching a packet array")
+    live = parser.add_argument_group("live monitor")
+    live.add_argument("--live", metavar="IFACE", help="Monitor the server's traffic on this interface instead of analyzing a capture")
+    live.add_argument("--follow", metavar="PCAP", help="Monitor a PCAP file that is still being written (e.g. by tcpdump)")
+    live.add_argument("--window", type=int, default=10, help="Sliding window for the live statistics in seconds")
+    live.add_argument("--alert_syn_rate", type=float, default=500, help="Alert above this many SYNs per second")
+    live.add_argument("--alert_half_open", type=float, default=0.5,
+                      help="Alert when more than this share of the window's SYNs did not complete the handshake")
+    live.add_argument("--alert_latency", type=float, default=500, help="Alert when the p95 handshake time exceeds this many ms")
     args = parser.parse_args()
-    
-    packets_pickle, connections_pickle = "packets.pkl", "connections.pkl"
-    
-    if args.load_packets and os.path.exists(packets_pickle):
-        print("[INFO] Loading packet data from cache...")
-        packets = pickle.load(open(packets_pickle, "rb"))
-    else:
-        packets = parse_packets(run_tshark(args.pcap_file))
-        pickle.dump(packets, open(packets_pickle, "wb"))
-        print("[INFO] Packet data saved to cache.")
-    
-    if args.load_connections and os.path.exists(connections_pickle):
-        print("[INFO] Loading connections from cache...")
-        connections = pickle.load(open(connections_pickle, "rb"))
+    if bool(args.pcap_file) + bool(args.live) + bool(args.follow) != 1:
+        parser.error("give exactly one of pcap_file, --live or --follow")
+
+    try:
+        server = ip_to_int(args.server_ip)
+    except OSError:
+        sys.exit(f"[ERROR] --server_ip must be an IPv4 address, got {args.server_ip!r}")
+    if args.live or args.follow:
+        monitor_live(args, server)
+        return
+    key = cache_key(args.pcap_file, args.server_ip, args.server_port)
+
+    connections_key = dict(key, half_open_timeout=args.half_open_timeout)
+    connections = load_cache(CONNECTIONS_CACHE, connections_key) if args.load_connections else None
+    if connections is not None:
+        print("[INFO] Loaded connections from cache.")
     else:
-        connections = analyze_packets(packets, args.server_ip, args.server_port)
-        pickle.dump(connections, open(connections_pickle, "wb"))
+        if args.stream:
+            # Packets are parsed and analyzed one at a time while tshark is still reading
+            connections = analyze_packets(iter_packets(stream_tshark(args.pcap_file)), server, args.server_port,
+                                          half_open_timeout=args.half_open_timeout)
+        else:
+            packets = load_cache(PACKETS_CACHE, key) if args.load_packets else None
+            if packets is not None:
+                print(f"[INFO] Loaded {len(packets)} packets from cache.")
+            else:
+                packets = build_packet_array(stream_tshark(args.pcap_file), server, args.server_port)
+                save_cache(PACKETS_CACHE, packets, key)
+                print("[INFO] Packet data saved to cache.")
+            connections = analyze_packets(iter_packet_array(packets), server, args.server_port, total=len(packets),
+                                          half_open_timeout=args.half_open_timeout)
+        save_cache(CONNECTIONS_CACHE, connections, connections_key)
         print("[INFO] Connections saved to cache.")
-    
+
+    if len(connections) == 0:
+        sys.exit(f"[ERROR] No connections to {args.server_ip}:{args.server_port} found in the capture.")
     start_times, durations = compute_durations(connections)
     plot_durations(start_times, durations, args.attack_start, args.attack_end)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
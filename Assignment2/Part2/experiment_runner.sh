@@ -26,7 +26,7 @@ echo "Ensure that the server is running at $SERVER_IP:$SERVER_PORT"
 
 # Step 1: Start packet capture
 echo "Initializing packet capture..."
-tcpdump -i any -w "$PCAP_FILE" tcp port $SERVER_PORT -v &
+tcpdump -i any -U -w "$PCAP_FILE" tcp port $SERVER_PORT -v &  # -U writes each packet immediately, for analysis.py --follow
 TCPDUMP_PID=$!
 sleep 2  # Allow tcpdump to start properly
 
@@ -1,42 +1,205 @@
+import argparse
+import csv
+import selectors
 import socket
+import struct
 import threading
 import time
 
 # Server Configuration
 LISTEN_ADDRESS = '0.0.0.0'  # Accept connections on all available interfaces
 LISTEN_PORT = 8000          # Port to bind the server to
+GREETING = b'Greetings from the server!\n'
+
+# struct tcp_info: 8 bytes of u8 fields, then u32 fields; tcpi_unacked (4) and tcpi_sacked (5)
+# are the accept queue length and backlog on a listening socket, tcpi_last_ack_recv (12) is in ms
+TCP_INFO_LENGTH = 104
+TCP_INFO_FIELDS = struct.Struct("8x13I")
+
+def tcp_info(sock):
+    """The u32 fields of the socket's TCP_INFO, or None where it is not supported (Linux only)."""
+    if not hasattr(socket, "TCP_INFO"):
+        return None
+    try:
+        return TCP_INFO_FIELDS.unpack_from(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, TCP_INFO_LENGTH))
+    except (OSError, struct.error):
+        return None
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+class ServerMetrics:
+    """Accept rate, accept-queue latency, handshake-to-response time and active connections per interval."""
+
+    COLUMNS = ["time", "accept_rate", "queue_p50_ms", "queue_p95_ms", "response_p50_ms", "response_p95_ms",
+               "active", "accept_queue", "backlog"]
+
+    def __init__(self, server, interval, csv_path=None):
+        self.server = server
+        self.interval = interval
+        self.next_report = time.monotonic() + interval
+        self.accepted = 0
+        self.queue_latencies = []  # ms from the handshake's final ACK to accept()
+        self.response_times = []   # ms from the handshake's final ACK to the response being sent
+        self.active = 0
+        self.writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.writer = csv.writer(self.csv_file)
+            self.writer.writerow(self.COLUMNS)
+
+    def accepted_connection(self, connection):
+        """Record an accept; returns the accept-queue latency in seconds (0 if unknown)."""
+        self.accepted += 1
+        self.active += 1
+        info = tcp_info(connection)
+        if info is None:
+            return 0.0
+        self.queue_latencies.append(info[12])
+        return info[12] / 1000
+
+    def responded(self, queue_latency, accepted_at):
+        self.response_times.append((queue_latency + time.monotonic() - accepted_at) * 1000)
+
+    def closed_connection(self):
+        self.active -= 1
+
+    def timeout(self):
+        return max(self.next_report - time.monotonic(), 0)
+
+    def report(self):
+        now = time.monotonic()
+        if now < self.next_report:
+            return
+        elapsed = now - self.next_report + self.interval
+        listen_info = tcp_info(self.server)
+        accept_queue, backlog = (listen_info[4], listen_info[5]) if listen_info else ("?", "?")
+        row = [f"{time.time():.3f}", f"{self.accepted / elapsed:.1f}",
+               f"{percentile(self.queue_latencies, 0.5):.1f}", f"{percentile(self.queue_latencies, 0.95):.1f}",
+               f"{percentile(self.response_times, 0.5):.1f}", f"{percentile(self.response_times, 0.95):.1f}",
+               self.active, accept_queue, backlog]
+        print(f"[METRICS] {row[1]} accepts/s | accept-queue latency p50 {row[2]} ms, p95 {row[3]} ms | "
+              f"handshake-to-response p50 {row[4]} ms, p95 {row[5]} ms | active {self.active} | "
+              f"accept queue {accept_queue}/{backlog}", flush=True)
+        if self.writer:
+            self.writer.writerow(row)
+            self.csv_file.flush()
+        self.accepted = 0
+        self.queue_latencies, self.response_times = [], []
+        self.next_report = now + self.interval
+
+    def close(self):
+        if self.writer:
+            self.csv_file.close()
 
 def client_handler(connection, client_address):
     """Process a single client connection"""
     print(f"Incoming connection from {client_address}")
     session_start = time.time()
-    
+
     try:
         # Send a welcome message
-        connection.sendall(b'Greetings from the server!\n')
+        connection.sendall(GREETING)
     finally:
         connection.close()
         session_end = time.time()
         print(f"Connection with {client_address} closed after {session_end - session_start:.4f} seconds")
 
-def run_server():
+def run_event_loop(server, metrics, accept_batch):
+    """Serve every client from one epoll loop: accept up to `accept_batch` connections per wakeup and greet them."""
+    server.setblocking(False)
+    selector = selectors.DefaultSelector()  # epoll on Linux
+    selector.register(server, selectors.EVENT_READ)
+    try:
+        while True:
+            for key, _ in selector.select(metrics.timeout()):
+                if key.fileobj is server:
+                    for _ in range(accept_batch):
+                        try:
+                            conn, addr = server.accept()
+                        except BlockingIOError:
+                            break
+                        except OSError as err:  # e.g. EMFILE, or the client reset while queued
+                            print(f"Accept failed: {err}")
+                            break
+                        accepted_at = time.monotonic()
+                        queue_latency = metrics.accepted_connection(conn)
+                        conn.setblocking(False)
+                        try:
+                            sent = conn.send(GREETING)
+                        except BlockingIOError:
+                            sent = 0
+                        except OSError:
+                            conn.close()
+                            metrics.closed_connection()
+                            continue
+                        if sent == len(GREETING):
+                            metrics.responded(queue_latency, accepted_at)
+                            conn.close()
+                            metrics.closed_connection()
+                        else:  # Send buffer full, finish when writable
+                            selector.register(conn, selectors.EVENT_WRITE, (GREETING[sent:], queue_latency, accepted_at))
+                else:
+                    conn = key.fileobj
+                    remaining, queue_latency, accepted_at = key.data
+                    try:
+                        remaining = remaining[conn.send(remaining):]
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        remaining = b""
+                    else:
+                        if not remaining:
+                            metrics.responded(queue_latency, accepted_at)
+                    if remaining:
+                        selector.modify(conn, selectors.EVENT_WRITE, (remaining, queue_latency, accepted_at))
+                    else:
+                        selector.unregister(conn)
+                        conn.close()
+                        metrics.closed_connection()
+            metrics.report()
+    finally:
+        for key in list(selector.get_map().values()):
+            if key.fileobj is not server:
+                key.fileobj.close()
+        selector.close()
+
+def run_server(mode="thread", backlog=5, accept_batch=64, metrics_interval=1.0, metrics_csv=None):
     """Initialize and run the server"""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
         server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        
+
         try:
             server.bind((LISTEN_ADDRESS, LISTEN_PORT))
-            server.listen(5)
-            print(f"Server active on {LISTEN_ADDRESS}:{LISTEN_PORT}")
-            
-            while True:
-                conn, addr = server.accept()
-                thread = threading.Thread(target=client_handler, args=(conn, addr), daemon=True)
-                thread.start()
+            server.listen(backlog)
+            print(f"Server active on {LISTEN_ADDRESS}:{LISTEN_PORT} ({mode} mode, backlog {backlog})")
+
+            if mode == "epoll":
+                metrics = ServerMetrics(server, metrics_interval, metrics_csv)
+                try:
+                    run_event_loop(server, metrics, accept_batch)
+                finally:
+                    metrics.close()
+            else:
+                while True:
+                    conn, addr = server.accept()
+                    thread = threading.Thread(target=client_handler, args=(conn, addr), daemon=True)
+                    thread.start()
         except KeyboardInterrupt:
             print("Server shutting down gracefully...")
         except Exception as err:
             print(f"Encountered an issue: {err}")
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="TCP server for the SYN-flood experiment.")
+    parser.add_argument("--mode", choices=["thread", "epoll"], default="thread",
+                        help="thread: one thread per connection; epoll: a single event loop that reports connection metrics")
+    parser.add_argument("--backlog", type=int, default=5, help="listen() backlog (the kernel caps it at net.core.somaxconn)")
+    parser.add_argument("--accept_batch", type=int, default=64, help="epoll mode: connections accepted per wakeup")
+    parser.add_argument("--metrics_interval", type=float, default=1.0, help="epoll mode: seconds between metrics reports")
+    parser.add_argument("--metrics", help="epoll mode: also write the metrics to this CSV file")
+    args = parser.parse_args()
+    run_server(args.mode, args.backlog, args.accept_batch, args.metrics_interval, args.metrics)
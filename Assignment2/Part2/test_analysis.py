@@ -0,0 +1,109 @@
+import math
+import random
+
+from analysis import ACK, FIN, RST, SYN, ConnectionTable, HealthMonitor
+
+SERVER, SERVER_PORT = 0x0A000001, 8000
+
+
+def reference_durations(packets):
+    """The original dict-based state machine of analyze_packets, as (start, end) pairs, plus port reuse."""
+    connections, finished = {}, []
+    for time, src, dst, sport, dport, flags in packets:
+        if dst == SERVER and dport == SERVER_PORT:
+            key, to_server = (src, sport), True
+        elif src == SERVER and sport == SERVER_PORT:
+            key, to_server = (dst, dport), False
+        else:
+            continue
+        if flags & SYN and not flags & ACK and to_server:
+            if key in connections and connections[key]["end"] is not None:
+                finished.append(connections.pop(key))  # A fresh SYN on a closed connection's port
+            connections.setdefault(key, {"start": time, "end": None, "fin_ack_seen": False})
+        info = connections.get(key)
+        if info is not None and info["end"] is None:
+            if flags & RST:
+                info["end"] = time
+            elif flags & FIN and flags & ACK:
+                info["fin_ack_seen"] = True
+            elif flags & ACK and info["fin_ack_seen"]:
+                info["end"] = time
+    return sorted((info["start"], math.nan if info["end"] is None else info["end"]) for info in finished + list(connections.values()))
+
+
+def table_durations(packets):
+    table = ConnectionTable(SERVER, SERVER_PORT)
+    for packet in packets:
+        table.update(*packet)
+    table.finish()
+    return sorted(zip(table.connections()["start"].tolist(), table.connections()["end"].tolist()))
+
+
+def same(a, b):
+    return len(a) == len(b) and all(x == y or (math.isnan(x) and math.isnan(y)) for pa, pb in zip(a, b) for x, y in zip(pa, pb))
+
+
+def test_syn_ack_after_fin_ack_closes_connection():
+    client, port = 0x0A000002, 40000
+    packets = [
+        (1.0, client, SERVER, port, SERVER_PORT, SYN),
+        (1.1, SERVER, client, SERVER_PORT, port, SYN | ACK),
+        (1.2, client, SERVER, port, SERVER_PORT, ACK),
+        (2.0, client, SERVER, port, SERVER_PORT, FIN | ACK),
+        (2.5, SERVER, client, SERVER_PORT, port, SYN | ACK),  # Retransmitted SYN-ACK
+    ]
+    assert table_durations(packets) == [(1.0, 2.5)]
+    assert same(table_durations(packets), reference_durations(packets))
+
+
+def test_syn_after_close_starts_new_connection():
+    client, port = 0x0A000002, 40000
+    packets = []
+    for start in (1.0, 5.0):  # The client reuses its source port for a second connection
+        packets += [
+            (start, client, SERVER, port, SERVER_PORT, SYN),
+            (start + 0.1, SERVER, client, SERVER_PORT, port, SYN | ACK),
+            (start + 0.2, client, SERVER, port, SERVER_PORT, ACK),
+            (start + 1.0, client, SERVER, port, SERVER_PORT, FIN | ACK),
+            (start + 1.1, SERVER, client, SERVER_PORT, port, ACK),
+        ]
+    assert table_durations(packets) == [(1.0, 2.1), (5.0, 6.1)]
+
+
+def test_matches_reference_on_random_captures():
+    rng = random.Random(0)
+    flag_choices = [SYN | ACK, ACK, FIN | ACK, RST, RST | ACK, FIN, SYN, 0]
+    for _ in range(50):
+        packets = []
+        for client in range(rng.randint(1, 30)):
+            time = rng.uniform(0, 10)
+            packets.append((time, client + 2, SERVER, 1024 + client, SERVER_PORT, SYN))
+            for _ in range(rng.randint(0, 8)):
+                time += rng.uniform(0.001, 0.5)
+                flags = rng.choice(flag_choices)
+                if rng.random() < 0.5:
+                    packets.append((time, client + 2, SERVER, 1024 + client, SERVER_PORT, flags))
+                else:
+                    packets.append((time, SERVER, client + 2, SERVER_PORT, 1024 + client, flags))
+        packets.sort()
+        assert same(table_durations(packets), reference_durations(packets))
+
+
+def test_latency_alert_stays_raised_without_handshakes():
+    table = ConnectionTable(SERVER, SERVER_PORT, half_open_timeout=30.0)
+    monitor = HealthMonitor(table, window=2, syn_rate=None, half_open_ratio=None, latency_ms=500)
+    client, port = 0x0A000002, 1024
+    monitor.advance(0.0)
+    for packet in [(0.1, client, SERVER, port, SERVER_PORT, SYN),
+                   (0.2, SERVER, client, SERVER_PORT, port, SYN | ACK),
+                   (0.9, client, SERVER, port, SERVER_PORT, ACK)]:  # 800 ms handshake
+        monitor.record(table.update(*packet))
+    monitor.advance(1.0)
+    assert "handshake p95" in monitor.alerts
+    # A flood: SYNs only, so the window soon holds no completed handshake at all
+    for second in range(1, 6):
+        for i in range(100):
+            port += 1
+            monitor.record(table.update(second + i / 100, client, SERVER, port, SERVER_PORT, SYN))
+        monitor.advance(second + 1.0)
+        assert "handshake p95" in monitor.alerts
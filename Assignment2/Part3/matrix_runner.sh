@@ -0,0 +1,74 @@
+# Runs all four Nagle x Delayed-ACK configurations at the same time, each on
+# its own port with its own capture, then analyzes the captures.
+
+# Configuration
+HOST="127.0.0.1"
+INTERFACE="lo"
+BASE_PORT=5001          # Configurations use BASE_PORT .. BASE_PORT+3
+PCAP_DIR="pcap_files"
+CONFIGS=("1 1" "1 0" "0 1" "0 0")  # "nagle delayed_ack"
+
+# Ensure the script is executed with root privileges (needed by tcpdump)
+if [ "$EUID" -ne 0 ]; then
+    echo "This script must be run as root. Use sudo."
+    exit 1
+fi
+
+cd "$(dirname "$0")" || exit 1
+which tcpdump >/dev/null || apt-get -y install tcpdump
+mkdir -p "$PCAP_DIR"
+
+TCPDUMP_PIDS=()
+SERVER_PIDS=()
+CLIENT_PIDS=()
+
+cleanup() {
+    kill "${CLIENT_PIDS[@]}" "${SERVER_PIDS[@]}" 2>/dev/null
+    kill -SIGINT "${TCPDUMP_PIDS[@]}" 2>/dev/null
+}
+trap 'cleanup; exit 1' INT TERM
+
+# Step 1: Start one capture per configuration
+echo "Starting packet captures..."
+for i in "${!CONFIGS[@]}"; do
+    read -r NAGLE DELAYED_ACK <<< "${CONFIGS[$i]}"
+    PORT=$((BASE_PORT + i))
+    PCAP_FILE="$PCAP_DIR/nagle${NAGLE}_delayed_ack${DELAYED_ACK}.pcap"
+    tcpdump -i "$INTERFACE" -w "$PCAP_FILE" tcp port $PORT 2>/dev/null &
+    TCPDUMP_PIDS+=($!)
+    echo "  Nagle=$NAGLE Delayed-ACK=$DELAYED_ACK -> port $PORT, $PCAP_FILE"
+done
+sleep 2  # Allow tcpdump to start properly
+
+# Step 2: Start the servers
+echo "Starting servers..."
+for i in "${!CONFIGS[@]}"; do
+    read -r NAGLE DELAYED_ACK <<< "${CONFIGS[$i]}"
+    python3 tcp_server.py --nagle $NAGLE --delayed_ack $DELAYED_ACK --host "$HOST" --port $((BASE_PORT + i)) &
+    SERVER_PIDS+=($!)
+done
+sleep 1  # Allow the servers to start listening
+
+# Step 3: Run all clients in parallel, so the matrix takes one transfer period
+echo "Starting clients..."
+for i in "${!CONFIGS[@]}"; do
+    read -r NAGLE DELAYED_ACK <<< "${CONFIGS[$i]}"
+    python3 tcp_client.py --nagle $NAGLE --delayed_ack $DELAYED_ACK --host "$HOST" --port $((BASE_PORT + i)) &
+    CLIENT_PIDS+=($!)
+done
+
+echo "Waiting for the transfers to finish..."
+wait "${CLIENT_PIDS[@]}"
+wait "${SERVER_PIDS[@]}"
+
+# Step 4: Stop the captures
+echo "Finalizing packet captures..."
+sleep 1  # Let the last FIN/ACK exchange reach the captures
+kill -SIGINT "${TCPDUMP_PIDS[@]}"
+wait "${TCPDUMP_PIDS[@]}"
+
+# Step 5: Analyze the new captures
+echo "Analyzing captures..."
+python3 analyze_pcap.py
+
+echo "Experiment matrix completed! Results are in pcap_analysis.csv"
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+HASH_CHUNK = 1 << 20
+BUSY_TIMEOUT_MS = 60000
+
+
+class ResultsStore:
+    """SQLite store of analysis results keyed by capture content and analysis parameters.
+
+    Every result table holds (content_hash, params, file_name, <columns>,
+    analyzed_at) rows, and the `completed` table records which (table,
+    content_hash, params, file_name) analyses finished, even ones that produced
+    no rows, so checking whether a capture was already analyzed is a single
+    primary key lookup no matter what it is called. The database runs in WAL mode with a busy timeout, so
+    several analyze_pcap.py runs can write to it at once. Each table also has a
+    view with the CSV columns, which export() writes out.
+    """
+
+    def __init__(self, path, tables):
+        """`tables` maps table name -> (view name, data columns)."""
+        self.tables = tables
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        with self.transaction():
+            self.conn.execute("CREATE TABLE IF NOT EXISTS file_hashes "
+                              "(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS completed (table_name TEXT, content_hash TEXT, params TEXT, file_name TEXT, "
+                              "PRIMARY KEY (table_name, content_hash, params, file_name))")
+            for table, (view, columns) in tables.items():
+                column_list = ", ".join(f'"{column}"' for column in columns)
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                                  f"(content_hash TEXT, params TEXT, file_name TEXT, {column_list}, analyzed_at REAL)")
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_key ON {table} (content_hash, params)")
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_file_name ON {table} (file_name)")
+                self.conn.execute(f"CREATE VIEW IF NOT EXISTS {view} AS SELECT file_name, {column_list} "
+                                  f"FROM {table} ORDER BY analyzed_at, rowid")
+
+    @contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front, so concurrent writers wait on busy_timeout instead of deadlocking
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def content_hash(self, pcap_path):
+        """SHA-256 of the capture, recomputed only when its size or modification time changes."""
+        path = os.path.abspath(pcap_path)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT size, mtime_ns, content_hash FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+            return row[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        with self.transaction():
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                              (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest()))
+        return digest.hexdigest()
+
+    def has(self, table, content_hash, params, file_name):
+        """True if `table` holds results for this content and parameters under `file_name`.
+
+        Results stored under another name (a renamed or copied capture) are
+        copied to `file_name` rather than recomputed.
+        """
+        params = json.dumps(params, sort_keys=True)
+        names = {name for (name,) in self.conn.execute(
+            "SELECT file_name FROM completed WHERE table_name = ? AND content_hash = ? AND params = ?",
+            (table, content_hash, params))}
+        if not names or file_name in names:
+            return bool(names)
+        columns = ", ".join(f'"{column}"' for column in self.tables[table][1])
+        with self.transaction():
+            self._delete_stale(table, content_hash, params, file_name)
+            self.conn.execute(f"INSERT INTO {table} SELECT content_hash, params, ?, {columns}, ? FROM {table} "
+                              f"WHERE content_hash = ? AND params = ? AND file_name = ?",
+                              (file_name, time.time(), content_hash, params, min(names)))
+            self.conn.execute("INSERT INTO completed VALUES (?, ?, ?, ?)", (table, content_hash, params, file_name))
+        return True
+
+    def _delete_stale(self, table, content_hash, params, file_name):
+        # Rows for this name from other content (the capture changed) or from an earlier run with the same parameters
+        self.conn.execute(f"DELETE FROM {table} WHERE file_name = ? AND (content_hash != ? OR params = ?)",
+                          (file_name, content_hash, params))
+        self.conn.execute("DELETE FROM completed WHERE table_name = ? AND file_name = ? AND (content_hash != ? OR params = ?)",
+                          (table, file_name, content_hash, params))
+
+    def _insert(self, table, content_hash, params, file_name, rows):
+        columns = self.tables[table][1]
+        values = rows[columns].astype(object).where(rows[columns].notna(), None).values.tolist()
+        placeholders = ", ".join("?" * (len(columns) + 4))
+        analyzed_at = time.time()
+        self.conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                              [(content_hash, params, file_name, *row, analyzed_at) for row in values])
+
+    def save(self, table, content_hash, params, file_name, rows):
+        """Replace the results of `file_name` in `table` with the DataFrame `rows`."""
+        params = json.dumps(params, sort_keys=True)
+        with self.transaction():
+            self._delete_stale(table, content_hash, params, file_name)
+            self._insert(table, content_hash, params, file_name, rows)
+            self.conn.execute("INSERT INTO completed VALUES (?, ?, ?, ?)", (table, content_hash, params, file_name))
+
+    def import_csv(self, table, csv_path):
+        """Load rows of a CSV written before the store existed, once, so they stay in the export.
+
+        They carry no content hash, so the next analysis of the same file name replaces them.
+        """
+        if not os.path.exists(csv_path):
+            return
+        with self.transaction():
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return
+            legacy = pd.read_csv(csv_path)
+            params = json.dumps({"imported": csv_path})
+            for file_name, rows in legacy.groupby("file_name", sort=False):
+                self._insert(table, "", params, file_name, rows)
+
+    def export(self, table, csv_path):
+        """Write the table's view to `csv_path` (atomically, so readers never see a partial file)."""
+        view = self.tables[table][0]
+        temp_path = f"{csv_path}.{os.getpid()}.tmp"
+        pd.read_sql_query(f"SELECT * FROM {view}", self.conn).to_csv(temp_path, index=False)
+        os.replace(temp_path, csv_path)
+
+    def close(self):
+        self.conn.close()
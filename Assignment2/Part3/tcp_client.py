@@ -1,48 +1,108 @@
 import socket
 import time
 import argparse
+import csv
+import threading
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(description="TCP Client with Nagle's Algorithm and Delayed ACK configuration.")
 parser.add_argument("--nagle", type=int, choices=[0, 1], required=True, help="Enable (1) or Disable (0) Nagle's Algorithm")
 parser.add_argument("--delayed_ack", type=int, choices=[0, 1], required=True, help="Enable (1) or Disable (0) Delayed ACK")
+parser.add_argument("--host", default="127.0.0.1", help="Server address")
+parser.add_argument("--port", type=int, default=5001, help="Server port")
+parser.add_argument("--size", type=int, default=4096, help="Bytes to send per flow (default 4 KB)")
+parser.add_argument("--rate", type=float, default=40, help="Sending rate per flow in bytes/second")
+parser.add_argument("--chunk", type=int, default=40, help="Bytes per send call")
+parser.add_argument("--flows", type=int, default=1, help="Number of parallel connections")
+parser.add_argument("--log", help="CSV file to write the timestamp of every send to")
 args = parser.parse_args()
 
 NAGLE_ENABLED = bool(args.nagle)
 DELAYED_ACK = bool(args.delayed_ack)
 
 # Configuration
-SERVER_IP = '127.0.0.1'  # Change this to the server's IP
-PORT = 5001
-FILE_SIZE = 4096  # 4 KB file
-TRANSFER_RATE = 40  # 40 bytes/second
+SERVER_IP = args.host  # Or pass --host with the server's IP
+PORT = args.port
+FILE_SIZE = args.size  # 4 KB file by default
+TRANSFER_RATE = args.rate  # 40 bytes/second by default
+CHUNK_SIZE = args.chunk
+SPIN_NS = 200_000  # Sleep until 0.2 ms before a send, sleep() overshoots by about that much, then spin
 
-# Create file data
-file_data = b"A" * FILE_SIZE
 
-# Create and configure socket
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((SERVER_IP, PORT))
+class TokenBucket:
+    """Token bucket on the monotonic clock: `rate` bytes/second, holding at most `capacity` bytes.
 
-# Configure Nagle’s Algorithm
-client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, not NAGLE_ENABLED)
+    Waits are computed from when the tokens will be available rather than by
+    sleeping a fixed time after each send, so pacing errors do not accumulate.
+    """
 
-# Configure Delayed ACK if supported
-if hasattr(socket, "TCP_QUICKACK"):
-    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, not DELAYED_ACK)
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity  # Start full, so the first chunk goes out immediately
+        self.updated_ns = time.perf_counter_ns()
 
-print(f"Client connected to {SERVER_IP}:{PORT} | Nagle: {NAGLE_ENABLED}, Delayed ACK: {DELAYED_ACK}")
+    def consume(self, nbytes):
+        """Block until `nbytes` tokens are available and take them."""
+        now = time.perf_counter_ns()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_ns) * self.rate / 1e9)
+        self.updated_ns = now
+        if self.tokens < nbytes:
+            ready_ns = now + int((nbytes - self.tokens) * 1e9 / self.rate)
+            if ready_ns - now > SPIN_NS:
+                time.sleep((ready_ns - now - SPIN_NS) / 1e9)
+            while time.perf_counter_ns() < ready_ns:
+                time.sleep(0)  # Release the GIL, so the other flows' threads are not stalled by this spin
+            self.tokens = nbytes
+            self.updated_ns = ready_ns
+        self.tokens -= nbytes
 
-# Send data at a controlled rate
-start_time = time.time()
 
-for i in range(0, len(file_data), TRANSFER_RATE):
-    chunk = file_data[i:i+TRANSFER_RATE]
-    client_socket.send(chunk)
-    time.sleep(1)  # 1-second delay for 40 B/s rate
+def run_flow(flow, sends, results):
+    # Create and configure socket
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client_socket.connect((SERVER_IP, PORT))
 
-end_time = time.time()
+    # Configure Nagle’s Algorithm
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, not NAGLE_ENABLED)
 
-print(f"File sent successfully in {end_time - start_time:.2f} seconds.")
+    # Configure Delayed ACK if supported
+    if hasattr(socket, "TCP_QUICKACK"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, not DELAYED_ACK)
 
-client_socket.close()
+    print(f"Flow {flow} connected to {SERVER_IP}:{PORT} from port {client_socket.getsockname()[1]} | Nagle: {NAGLE_ENABLED}, Delayed ACK: {DELAYED_ACK}")
+
+    # Send data at a controlled rate
+    file_data = memoryview(b"A" * FILE_SIZE)
+    bucket = TokenBucket(TRANSFER_RATE, max(CHUNK_SIZE, 1))
+    start_time = time.perf_counter_ns()
+
+    for i in range(0, len(file_data), CHUNK_SIZE):
+        chunk = file_data[i:i+CHUNK_SIZE]
+        bucket.consume(len(chunk))
+        wall_ns = time.time_ns()
+        send_ns = time.perf_counter_ns()
+        client_socket.sendall(chunk)
+        sends.append((flow, i, len(chunk), wall_ns, send_ns - start_time, time.perf_counter_ns() - send_ns))
+
+    end_time = time.perf_counter_ns()
+    results[flow] = (end_time - start_time) / 1e9
+    client_socket.close()
+
+
+sends = []  # (flow, offset, bytes, wall clock ns, ns since the flow started, ns spent in sendall)
+results = {}
+threads = [threading.Thread(target=run_flow, args=(flow, sends, results)) for flow in range(args.flows)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+
+for flow, duration in sorted(results.items()):
+    print(f"Flow {flow}: file sent successfully in {duration:.2f} seconds ({FILE_SIZE / duration if duration else 0:.1f} B/s).")
+
+if args.log:
+    with open(args.log, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["flow", "offset", "bytes", "time_ns", "elapsed_ns", "send_ns"])
+        writer.writerows(sorted(sends))
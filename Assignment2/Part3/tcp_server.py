@@ -1,48 +1,157 @@
 import socket
+import selectors
 import time
 import argparse
+import csv
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(description="TCP Server with Nagle's Algorithm and Delayed ACK configuration.")
 parser.add_argument("--nagle", type=int, choices=[0, 1], required=True, help="Enable (1) or Disable (0) Nagle's Algorithm")
 parser.add_argument("--delayed_ack", type=int, choices=[0, 1], required=True, help="Enable (1) or Disable (0) Delayed ACK")
+parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+parser.add_argument("--port", type=int, default=5001, help="Server port")
+parser.add_argument("--multi", action="store_true", help="Serve many concurrent clients from an event loop instead of a single connection")
+parser.add_argument("--connections", type=int, default=0, help="With --multi, exit after this many connections have closed (0 = run until Ctrl+C)")
+parser.add_argument("--buffer_size", type=int, default=65536, help="Initial receive buffer size per connection in bytes (doubled when full)")
+parser.add_argument("--log", help="CSV file to write the arrival time and size of every received chunk to")
 args = parser.parse_args()
 
 NAGLE_ENABLED = bool(args.nagle)
 DELAYED_ACK = bool(args.delayed_ack)
 
 # Configuration
-HOST = '0.0.0.0'  # Listen on all interfaces
-PORT = 5001
+HOST = args.host  # Listen on all interfaces by default
+PORT = args.port
+
+
+class ReceiveBuffer:
+    """Preallocated receive buffer filled in place with recv_into; doubles when full."""
+
+    def __init__(self, size):
+        self.buffer = bytearray(max(size, 1))
+        self.view = memoryview(self.buffer)
+        self.length = 0
+
+    def recv_into(self, sock):
+        if self.length == len(self.buffer):
+            self.view.release()
+            self.buffer.extend(bytes(len(self.buffer)))
+            self.view = memoryview(self.buffer)
+        return sock.recv_into(self.view[self.length:])
+
+
+class Connection:
+    """Received data, byte count and per-chunk arrival timestamps of one client."""
+
+    def __init__(self, conn, addr, buffer_size):
+        self.conn = conn
+        self.addr = addr
+        self.data = ReceiveBuffer(buffer_size)
+        self.arrivals = []  # (arrival time, bytes) per recv
+        self.start_time = time.time()
+
+    def receive(self):
+        """Read what is available; returns False once the peer has closed the connection."""
+        nbytes = self.data.recv_into(self.conn)
+        if nbytes:
+            self.arrivals.append((time.time(), nbytes))
+            self.data.length += nbytes
+        return nbytes > 0
+
+    def summary(self):
+        end_time = self.arrivals[-1][0] if self.arrivals else self.start_time
+        return f"Received {self.data.length} bytes from {self.addr} in {end_time - self.start_time:.2f} seconds ({len(self.arrivals)} recv calls)."
+
+
+def configure(conn):
+    # Configure Nagle’s Algorithm
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, not NAGLE_ENABLED)
+
+    # Configure Delayed ACK if supported
+    if hasattr(socket, "TCP_QUICKACK"):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, not DELAYED_ACK)
+
+
+def write_log(connections, log_path):
+    with open(log_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["connection", "peer", "time", "bytes"])
+        for number, connection in enumerate(connections):
+            peer = f"{connection.addr[0]}:{connection.addr[1]}"
+            writer.writerows((number, peer, f"{arrival:.6f}", nbytes) for arrival, nbytes in connection.arrivals)
+
+
+def serve_single(server_socket):
+    conn, addr = server_socket.accept()
+    print("Connected by", addr)
+    configure(conn)
+
+    connection = Connection(conn, addr, args.buffer_size)
+    while connection.receive():
+        pass
+
+    print(connection.summary())
+    conn.close()
+    return [connection]
+
+
+def serve_multi(server_socket):
+    server_socket.setblocking(False)
+    selector = selectors.DefaultSelector()  # epoll on Linux
+    selector.register(server_socket, selectors.EVENT_READ)
+    finished = []
+
+    try:
+        while not args.connections or len(finished) < args.connections:
+            for key, _ in selector.select():
+                if key.fileobj is server_socket:
+                    # Accept every pending connection before going back to select
+                    while True:
+                        try:
+                            conn, addr = server_socket.accept()
+                        except BlockingIOError:
+                            break
+                        conn.setblocking(False)
+                        configure(conn)
+                        selector.register(conn, selectors.EVENT_READ, Connection(conn, addr, args.buffer_size))
+                    continue
+                connection = key.data
+                try:
+                    open_ = connection.receive()
+                except BlockingIOError:
+                    continue
+                except ConnectionError:
+                    open_ = False
+                if not open_:
+                    selector.unregister(connection.conn)
+                    connection.conn.close()
+                    print(connection.summary())
+                    finished.append(connection)
+    except KeyboardInterrupt:
+        print("Stopping server.")
+    finally:
+        for key in list(selector.get_map().values()):
+            if key.data is not None:
+                key.fileobj.close()
+                print(key.data.summary())
+                finished.append(key.data)
+        selector.close()
+
+    total = sum(connection.data.length for connection in finished)
+    print(f"Served {len(finished)} connections, {total} bytes in total.")
+    return finished
+
 
 # Create and configure socket
 server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 server_socket.bind((HOST, PORT))
-server_socket.listen(1)
+server_socket.listen(socket.SOMAXCONN if args.multi else 1)
 
 print(f"Server listening on port {PORT} | Nagle: {NAGLE_ENABLED}, Delayed ACK: {DELAYED_ACK}")
-conn, addr = server_socket.accept()
-print("Connected by", addr)
-
-# Configure Nagle’s Algorithm
-conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, not NAGLE_ENABLED)
-
-# Configure Delayed ACK if supported
-if hasattr(socket, "TCP_QUICKACK"):
-    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, not DELAYED_ACK)
-
-received_data = b""
-start_time = time.time()
-
-while True:
-    data = conn.recv(1024)
-    if not data:
-        break
-    received_data += data
+connections = serve_multi(server_socket) if args.multi else serve_single(server_socket)
 
-end_time = time.time()
-print(f"Received {len(received_data)} bytes in {end_time - start_time:.2f} seconds.")
+if args.log:
+    write_log(connections, args.log)
 
-conn.close()
 server_socket.close()
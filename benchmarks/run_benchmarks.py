@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from synthetic_pcap import DEFAULT_FLAG_MIX, generate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_PREFIX = "BENCH "
+
+
+def load_module(relative_path):
+    """Import one of the analyzer scripts by path (its folder is added to sys.path for sibling imports)."""
+    path = os.path.join(REPO_ROOT, relative_path)
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # Needed to pickle its functions for process pools
+    spec.loader.exec_module(module)
+    return module
+
+
+# Each suite runs in its own process: (analyzer script, [(stage name, stage function)]).
+# Stage functions receive the imported module and a context dict shared by later stages.
+SUITES = {
+    "a1-rdpcap": ("Assignment1/Part1/analysis.py", [
+        ("load", lambda m, ctx: ctx.update(packets=m.rdpcap(ctx["pcap"]))),
+        ("analyze", lambda m, ctx: m.analyze_packets(ctx["packets"])),
+    ]),
+    "a1-stream": ("Assignment1/Part1/analysis.py", [
+        ("stream", lambda m, ctx: m.stream_pcap(ctx["pcap"], progress=False)),
+    ]),
+    "a1-columnar": ("Assignment1/Part1/analysis.py", [
+        ("build_table", lambda m, ctx: ctx.update(table=m.build_packet_table(ctx["pcap"], progress=False))),
+        ("group_by", lambda m, ctx: m.stats_from_table(ctx["table"])),
+    ]),
+    "a1-parallel": ("Assignment1/Part1/analysis.py", [
+        ("parallel", lambda m, ctx: m.parallel_analysis(ctx["pcap"], ctx["workers"])),
+    ]),
+    "a1-approx": ("Assignment1/Part1/analysis.py", [
+        ("stream_approx", lambda m, ctx: m.stream_pcap(ctx["pcap"], progress=False,
+                                                       sketch_params=dict(epsilon=1e-4, delta=1e-3, hll_error=0.01))),
+    ]),
+    "a2p1-pyshark": ("Assignment2/Part1/analyze_pcap.py", [
+        ("load", lambda m, ctx: ctx.update(cap=list(importlib.import_module("pyshark").FileCapture(ctx["pcap"], display_filter="tcp")))),
+        ("throughput", lambda m, ctx: m.calculate_throughput(ctx["cap"])),
+        ("goodput", lambda m, ctx: m.calculate_goodput(ctx["cap"])),
+        ("max_window", lambda m, ctx: m.calculate_max_window(ctx["cap"])),
+        ("loss_rate", lambda m, ctx: m.calculate_packet_loss_rate(ctx["pcap"])),
+    ]),
+    "a2p1-stream": ("Assignment2/Part1/analyze_pcap.py", [
+        ("single_pass", lambda m, ctx: m.analyze_file(ctx["pcap"])),
+    ]),
+    "a2p1-timeseries": ("Assignment2/Part1/analyze_pcap.py", [
+        ("single_pass_series", lambda m, ctx: m.analyze_file(ctx["pcap"], interval=0.1)),
+    ]),
+    "a2p1-retransmissions": ("Assignment2/Part1/analyze_pcap.py", [
+        ("single_pass_retransmissions", lambda m, ctx: m.analyze_file(ctx["pcap"], retransmissions=True)),
+    ]),
+    "a2p1-rtt": ("Assignment2/Part1/analyze_pcap.py", [
+        ("single_pass_rtt", lambda m, ctx: m.analyze_file(ctx["pcap"], rtt_interval=1.0)),
+    ]),
+    "a2p2-tshark": ("Assignment2/Part2/analysis.py", [
+        # tshark's output is parsed while it streams, so extraction and parsing are one stage
+        ("tshark_parse", lambda m, ctx: ctx.update(packets=m.build_packet_array(
+            m.stream_tshark(ctx["pcap"]), m.ip_to_int(ctx["server_ip"]), ctx["server_port"]))),
+        ("analyze", lambda m, ctx: m.analyze_packets(
+            m.iter_packet_array(ctx["packets"]), m.ip_to_int(ctx["server_ip"]), ctx["server_port"],
+            total=len(ctx["packets"]))),
+    ]),
+}
+
+
+def report(record):
+    print(BENCH_PREFIX + json.dumps(record), flush=True)
+
+
+def run_child(suite, context):
+    """Run one suite's stages in this process and report time and peak RSS after each stage."""
+    script, stages = SUITES[suite]
+    try:
+        module = load_module(script)
+    except ImportError as e:
+        report({"stage": "import", "skipped": str(e)})
+        return
+    for name, stage in stages:
+        started = time.perf_counter()
+        try:
+            stage(module, context)
+        except (ImportError, FileNotFoundError) as e:
+            report({"stage": name, "skipped": str(e)})
+            return
+        except SystemExit as e:  # Analyzers exit on missing external tools (e.g. tshark)
+            report({"stage": name, "skipped": str(e)})
+            return
+        seconds = time.perf_counter() - started
+        # Include worker processes (process pools) in the peak
+        peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        peak_rss_mb = peak_rss_kb / 1024
+        report({"stage": name, "seconds": seconds, "peak_rss_mb": peak_rss_mb})
+
+
+def run_suite(suite, pcap, packets, args):
+    """Run a suite in a fresh interpreter so its peak RSS is not shared with other suites."""
+    run_dir = os.path.join(args.workdir, "run")
+    os.makedirs(run_dir, exist_ok=True)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", suite, "--pcap", os.path.abspath(pcap),
+           "--workers", str(args.workers), "--server_ip", args.server_ip, "--server_port", str(args.server_port)]
+    env = dict(os.environ, MPLBACKEND="Agg")
+    completed = subprocess.run(cmd, cwd=run_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    results = []
+    for line in completed.stdout.splitlines():
+        if line.startswith(BENCH_PREFIX):
+            record = json.loads(line[len(BENCH_PREFIX):])
+            record.update(suite=suite, packets=packets)
+            if "seconds" in record:
+                record["packets_per_sec"] = packets / record["seconds"] if record["seconds"] > 0 else float("inf")
+            results.append(record)
+    if completed.returncode != 0:
+        error = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+        results.append({"suite": suite, "packets": packets, "stage": "-", "skipped": error})
+    return results
+
+
+def print_results(results):
+    print(f"\n{'suite':<14} {'stage':<14} {'packets':>11} {'wall (s)':>10} {'pkts/s':>12} {'peak RSS (MB)':>14}")
+    for record in results:
+        if "skipped" in record:
+            print(f"{record['suite']:<14} {record['stage']:<14} {record['packets']:>11} skipped: {record['skipped']}")
+        else:
+            print(f"{record['suite']:<14} {record['stage']:<14} {record['packets']:>11} {record['seconds']:>10.3f} "
+                  f"{record['packets_per_sec']:>12.0f} {record['peak_rss_mb']:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pcap analyzers on deterministic synthetic captures.")
+    parser.add_argument("--packets", type=int, nargs="+", default=[10000, 100000],
+                        help="Capture sizes to benchmark (packets), e.g. 10000 1000000 100000000")
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=sorted(SUITES), help="Suites to run")
+    parser.add_argument("--flows", type=int, default=1000, help="Number of distinct flows in the synthetic capture")
+    parser.add_argument("--flag_mix", default=DEFAULT_FLAG_MIX, help="TCP flag mix (see synthetic_pcap.py)")
+    parser.add_argument("--payload_min", type=int, default=0)
+    parser.add_argument("--payload_max", type=int, default=1460)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes for parallel suites")
+    parser.add_argument("--server_ip", default="192.168.56.104")
+    parser.add_argument("--server_port", type=int, default=8000)
+    parser.add_argument("--workdir", default=".bench_data", help="Where synthetic captures and analyzer outputs are kept")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--pcap", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, {"pcap": args.pcap, "workers": args.workers,
+                               "server_ip": args.server_ip, "server_port": args.server_port})
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = []
+    for packets in args.packets:
+        params = f"{packets}_{args.flows}_{args.flag_mix}_{args.payload_min}_{args.payload_max}_{args.seed}_{args.server_ip}_{args.server_port}"
+        pcap = os.path.join(args.workdir, f"synthetic_{packets}_{hashlib.sha256(params.encode()).hexdigest()[:12]}.pcap")
+        if not os.path.exists(pcap):
+            print(f"[INFO] Generating {packets} packets into {pcap}...")
+            generate(pcap, packets, args.flows, args.flag_mix, args.payload_min, args.payload_max,
+                     seed=args.seed, server_ip=args.server_ip, server_port=args.server_port)
+        for suite in args.suites:
+            print(f"[INFO] Running {suite} on {packets} packets...")
+            results.extend(run_suite(suite, pcap, packets, args))
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"[INFO] Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import random
+import socket
+import struct
+
+# TCP flag bits
+TCP_FLAGS = {"F": 0x01, "S": 0x02, "R": 0x04, "P": 0x08, "A": 0x10, "U": 0x20}
+DEFAULT_FLAG_MIX = "S:0.02,SA:0.02,A:0.45,PA:0.47,FA:0.03,R:0.01"
+
+PCAP_GLOBAL_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)  # Ethernet, microseconds
+RECORD_HEADER = struct.Struct("<IIII")
+ETHERNET_HEADER = bytes.fromhex("020000000002" "020000000001" "0800")
+IP_HEADER = struct.Struct("!BBHHHBBH4s4s")
+TCP_HEADER = struct.Struct("!HHIIBBHHH")
+HEADERS_LEN = len(ETHERNET_HEADER) + IP_HEADER.size + TCP_HEADER.size
+WRITE_BATCH = 1 << 14
+
+
+def parse_flag_mix(text):
+    """Parse "S:0.02,SA:0.02,A:0.5,..." into [(flag bits, weight)]."""
+    mix = []
+    for item in text.split(","):
+        flags, weight = item.split(":")
+        bits = 0
+        for letter in flags.strip().upper():
+            bits |= TCP_FLAGS[letter]
+        mix.append((bits, float(weight)))
+    return mix
+
+
+def make_flows(rng, flows, server_ip, server_port):
+    """Client endpoints talking to one server, as (client ip, client port, server ip, server port)."""
+    server = socket.inet_aton(server_ip)
+    return [(struct.pack("!I", rng.randrange(0x0A000001, 0x0AFFFFFF)), rng.randrange(1024, 65536), server, server_port)
+            for _ in range(flows)]
+
+
+def generate(output, packets, flows=1000, flag_mix=DEFAULT_FLAG_MIX, payload_min=0, payload_max=1460,
+             pps=100000, seed=0, server_ip="192.168.56.104", server_port=8000, start_time=1700000000.0):
+    """Write a deterministic synthetic TCP capture.
+
+    The same arguments always produce byte-identical files. SYN and payload
+    carrying (PSH) segments go client -> server, SYN-ACK and pure ACKs go
+    server -> client, and FIN/RST pick a direction at random. Payloads are
+    drawn uniformly from [payload_min, payload_max] for PSH segments only;
+    sequence and acknowledgment numbers advance per flow.
+    """
+    rng = random.Random(seed)
+    endpoints = make_flows(rng, flows, server_ip, server_port)
+    client_seq = [rng.getrandbits(32) for _ in range(flows)]
+    server_seq = [rng.getrandbits(32) for _ in range(flows)]
+    mix = parse_flag_mix(flag_mix)
+    flag_values = [bits for bits, _ in mix]
+    flag_weights = [weight for _, weight in mix]
+    payload = bytes(payload_max)
+    ip_id = 0
+
+    with open(output, "wb") as file:
+        file.write(PCAP_GLOBAL_HEADER)
+        for batch_start in range(0, packets, WRITE_BATCH):
+            batch = min(WRITE_BATCH, packets - batch_start)
+            flags_batch = rng.choices(flag_values, weights=flag_weights, k=batch)
+            chunks = []
+            for index, flags in enumerate(flags_batch):
+                flow = rng.randrange(flows)
+                client_ip, client_port, srv_ip, srv_port = endpoints[flow]
+                if flags & TCP_FLAGS["S"] and not flags & TCP_FLAGS["A"] or flags & TCP_FLAGS["P"]:
+                    from_client = True
+                elif flags & (TCP_FLAGS["F"] | TCP_FLAGS["R"]):
+                    from_client = rng.random() < 0.5
+                else:
+                    from_client = False
+                length = rng.randint(payload_min, payload_max) if flags & TCP_FLAGS["P"] else 0
+                if from_client:
+                    src, dst, sport, dport = client_ip, srv_ip, client_port, srv_port
+                    seq, ack = client_seq[flow], server_seq[flow]
+                    client_seq[flow] = (seq + length) & 0xFFFFFFFF
+                else:
+                    src, dst, sport, dport = srv_ip, client_ip, srv_port, client_port
+                    seq, ack = server_seq[flow], client_seq[flow]
+                    server_seq[flow] = (seq + length) & 0xFFFFFFFF
+                ip_id = (ip_id + 1) & 0xFFFF
+                ip_header = IP_HEADER.pack(0x45, 0, 40 + length, ip_id, 0x4000, 64, 6, 0, src, dst)
+                tcp_header = TCP_HEADER.pack(sport, dport, seq, ack, 0x50, flags, 65535, 0, 0)
+                timestamp = start_time + (batch_start + index) / pps
+                ts_sec = int(timestamp)
+                caplen = HEADERS_LEN + length
+                chunks.append(RECORD_HEADER.pack(ts_sec, int((timestamp - ts_sec) * 1e6), caplen, caplen))
+                chunks.append(ETHERNET_HEADER)
+                chunks.append(ip_header)
+                chunks.append(tcp_header)
+                chunks.append(payload[:length])
+            file.write(b"".join(chunks))
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic TCP pcap for benchmarking.")
+    parser.add_argument("output", help="Path of the pcap file to write")
+    parser.add_argument("--packets", type=int, default=100000, help="Number of packets")
+    parser.add_argument("--flows", type=int, default=1000, help="Number of distinct client flows")
+    parser.add_argument("--flag_mix", default=DEFAULT_FLAG_MIX,
+                        help="Comma-separated FLAGS:weight pairs, e.g. 'S:0.5,SA:0.1,A:0.4' for a SYN-heavy capture")
+    parser.add_argument("--payload_min", type=int, default=0, help="Minimum payload of PSH segments (bytes)")
+    parser.add_argument("--payload_max", type=int, default=1460, help="Maximum payload of PSH segments (bytes)")
+    parser.add_argument("--pps", type=float, default=100000, help="Packet rate used to space timestamps")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--server_ip", default="192.168.56.104")
+    parser.add_argument("--server_port", type=int, default=8000)
+    args = parser.parse_args()
+
+    generate(args.output, args.packets, args.flows, args.flag_mix, args.payload_min, args.payload_max,
+             args.pps, args.seed, args.server_ip, args.server_port)
+    print(f"[INFO] Wrote {args.packets} packets to {args.output}")
+
+
+if __name__ == "__main__":
+    main()